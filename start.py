@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
 """
 Woosh - Quick start for frontend and backend
+
+    python start.py          # development: backend with --reload + frontend
+    python start.py --prod   # production: preforked backend workers only
 """
+
+import argparse
+import importlib.util
 import os
 import subprocess
 import sys
@@ -114,9 +120,67 @@ def start_frontend():
         return None
 
 
+def production_command():
+    """Command line serving the backend with one worker process per CPU."""
+    backend_dir = Path(__file__).parent / "woosh" / "backend"
+    if os.name != "nt" and importlib.util.find_spec("gunicorn"):
+        # Preloads the app in the master; settings in gunicorn.conf.py
+        return [sys.executable, "-m", "gunicorn", "app:app", "-c", "gunicorn.conf.py"]
+
+    # No gunicorn (e.g. Windows): uvicorn's own process manager, which imports
+    # the app in every worker instead of sharing it
+    sys.path.insert(0, str(backend_dir))
+    import config
+
+    return [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "app:app",
+        "--host",
+        config.SERVER_HOST,
+        "--port",
+        str(config.SERVER_PORT),
+        "--workers",
+        str(config.SERVER_WORKERS),
+        "--timeout-graceful-shutdown",
+        str(int(config.SERVER_GRACEFUL_TIMEOUT)),
+    ] + (
+        ["--limit-max-requests", str(config.SERVER_MAX_REQUESTS)]
+        if config.SERVER_MAX_REQUESTS
+        else []
+    )
+
+
+def start_production():
+    """Run the backend in production mode until it exits"""
+    print(f"{Colors.BLUE}[Backend]{Colors.END} Starting production server...")
+
+    backend_dir = Path(__file__).parent / "woosh" / "backend"
+    command = production_command()
+    print(f"  {' '.join(command[1:])}\n")
+
+    try:
+        # The server handles signals itself; just wait for it
+        return subprocess.call(command, cwd=backend_dir)
+    except KeyboardInterrupt:
+        return 0
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Start the Woosh application")
+    parser.add_argument(
+        "--prod",
+        action="store_true",
+        help="Serve the backend with preforked workers (no reload, no frontend)",
+    )
+    args = parser.parse_args()
+
     print_header()
 
+    if args.prod:
+        return start_production()
+
     if not check_dependencies():
         print(f"\n{Colors.RED}Cannot start application.{Colors.END}")
         return 1
@@ -1,6 +1,11 @@
 """Company Finder - VAT validation and web search."""
 
-from .search import search_companies
-from .vies import validate_vat
+from .search import search_companies, search_companies_async
+from .vies import validate_vat, validate_vat_async
 
-__all__ = ["validate_vat", "search_companies"]
+__all__ = [
+    "validate_vat",
+    "validate_vat_async",
+    "search_companies",
+    "search_companies_async",
+]
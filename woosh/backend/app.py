@@ -1,12 +1,108 @@
-from typing import Dict, List
+import asyncio
+import csv
+import hmac
+import io
+import json
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Query
+from classify import (
+    active_rules,
+    domain_memo_stats,
+    reload_rules,
+    watch_rules_file,
+)
+from config import (
+    ADMIN_TOKEN,
+    RULES_FILE,
+    RULES_WATCH_INTERVAL,
+    SEARCH_BATCH_MAX_ITEMS,
+    VIES_BATCH_MAX_ITEMS,
+)
+from domains import public_suffix_list
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from search import search_companies
-from vies import VATInfo, validate_vat
+from fastapi.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from fastjson import dumps
+from metrics import REQUEST_SECONDS, render
+from pydantic import BaseModel, Field
+from rules import RulesError
+from search import (
+    SearchError,
+    SearchRateLimitedError,
+    iter_search_events_async,
+    merge_results,
+    search_cache_stats,
+    search_companies_async,
+    search_companies_batch,
+    search_response_async,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from vies import (
+    VATInfo,
+    async_client_ready,
+    close_async_client,
+    parse_vat_input,
+    precheck_vat,
+    preload_async_client,
+    validate_vat_async,
+    validate_vat_batch,
+    validate_vat_json_async,
+    vat_cache_stats,
+    warm_up_async_client,
+)
+
+
+def preload() -> None:
+    """
+    Build shared state once, before a preforking server starts its workers.
+
+    The compiled rules already exist at import; this adds the Public Suffix
+    List trie and the VIES client, which workers then share copy-on-write.
+    """
+    public_suffix_list()
+    preload_async_client()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Parse the VIES WSDL in the background (unless preload() already did);
+    # /api/ready reports when it's done
+    warm_up = asyncio.create_task(warm_up_async_client())
+    # Pick up edits to the rule file without a restart
+    watcher = None
+    if RULES_FILE and RULES_WATCH_INTERVAL > 0:
+        watcher = asyncio.create_task(
+            watch_rules_file(RULES_FILE, RULES_WATCH_INTERVAL)
+        )
+    yield
+    warm_up.cancel()
+    if watcher is not None:
+        watcher.cancel()
+    # Release pooled VIES connections on shutdown
+    await close_async_client()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson when it is installed (see fastjson.py)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
 
-app = FastAPI(title="Woosh API", version="1.0.0")
+
+app = FastAPI(
+    title="Woosh API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 
 # Configure CORS
 app.add_middleware(
@@ -18,9 +114,75 @@ app.add_middleware(
 )
 
 
+# Plain ASGI middleware: unlike @app.middleware("http"), no extra task or
+# memory stream per request on the hot path
+
+
+class TimeRequestsMiddleware:
+    """Observe request latency (including the streamed body) per route."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Label by route template so path parameters don't explode cardinality
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+            )
+
+
+class RulesVersionMiddleware:
+    """Add an X-Rules-Version header naming the rules active at request start."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        version = active_rules().version.encode("latin-1")
+
+        async def send_with_version(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-rules-version", version))
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_version)
+
+
+app.add_middleware(TimeRequestsMiddleware)
+app.add_middleware(RulesVersionMiddleware)
+
+
+@app.exception_handler(SearchError)
+async def search_error_handler(request: Request, exc: SearchError):
+    """Throttled searches answer 429, failed ones 503, with Retry-After if known."""
+    status_code = 429 if isinstance(exc, SearchRateLimitedError) else 503
+    headers = {}
+    if exc.retry_after is not None:
+        headers["Retry-After"] = str(max(1, math.ceil(exc.retry_after)))
+    return JSONResponse(
+        status_code=status_code, content={"detail": str(exc)}, headers=headers
+    )
+
+
 class SearchResponse(BaseModel):
     results: Dict[str, List[str]]
     total: int
+    rules_version: str
 
 
 @app.get("/")
@@ -28,22 +190,167 @@ def root():
     return {"message": "Woosh API is running", "version": "1.0.0"}
 
 
+@app.get("/api/ready")
+def ready():
+    """Readiness probe: 200 once the VIES client is warm, 503 until then."""
+    if not async_client_ready():
+        raise HTTPException(status_code=503, detail="VIES client is warming up")
+    return {"status": "ready"}
+
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    """Hit/miss counters of the result caches and the domain memo."""
+    return {
+        "search": search_cache_stats(),
+        "vat": vat_cache_stats(),
+        "domains": domain_memo_stats(),
+    }
+
+
+@app.get("/api/rules")
+def rules_info():
+    """Version and rule counts of the active classification rules."""
+    return active_rules().summary()
+
+
+def require_admin(request: Request) -> None:
+    """Admin endpoints need ``Authorization: Bearer <WOOSH_ADMIN_TOKEN>``.
+
+    Without a configured token they answer 404, as if they didn't exist.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+        token.encode(), ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid admin token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@app.post("/api/admin/rules/reload", dependencies=[Depends(require_admin)])
+async def rules_reload():
+    """
+    Re-read the rule file (WOOSH_RULES_FILE) and swap the new rules in.
+
+    The file is parsed and compiled off the event loop; requests in flight
+    finish with the previous rules. An invalid file is rejected with 400 and
+    the active rules stay in place.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        ruleset = await loop.run_in_executor(None, reload_rules)
+    except RulesError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid rule file: {str(e)}")
+    return ruleset.summary()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics in the text exposition format."""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/search", response_model=SearchResponse)
-def search(
+async def search(
     query: str = Query(..., description="Company name to search for"),
     max_results: int = Query(
         100, ge=1, le=200, description="Maximum number of results"
     ),
+    categories: Optional[List[str]] = Query(
+        None, description="Only return these categories; stop once they are filled"
+    ),
+    time_budget: Optional[float] = Query(
+        None, gt=0, le=30, description="Stop fetching results after N seconds"
+    ),
 ):
     """Search for companies and categorize results by domain type."""
-    results = search_companies(query, max_results)
-    total = sum(len(urls) for urls in results.values())
+    # Cached responses are stored encoded: send the bytes as they are
+    body = await search_response_async(
+        query, max_results, categories=categories, time_budget=time_budget
+    )
+    return Response(content=body, media_type="application/json")
+
+
+class CompanyProfile(BaseModel):
+    vat: VATInfo
+    results: Dict[str, List[str]]
+    total: int
+
 
-    return SearchResponse(results=results, total=total)
+class SearchBatchRequest(BaseModel):
+    queries: List[str]
+    max_results: int = Field(100, ge=1, le=200)
+
+
+@app.post("/api/search/batch")
+async def search_batch(request: SearchBatchRequest):
+    """
+    Search many company names, streaming one result per line as NDJSON.
+
+    Each line is ``{"query", "results", "total"}`` with the same ranking as
+    /api/search, plus ``error`` for searches that failed or were throttled.
+    Duplicate queries (after normalization) are searched once and results
+    arrive in completion order.
+    """
+    if len(request.queries) > SEARCH_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=(
+                f"Batch too large: {len(request.queries)} > "
+                f"{SEARCH_BATCH_MAX_ITEMS} queries"
+            ),
+        )
+
+    async def stream() -> AsyncIterator[str]:
+        async for query, results, error in search_companies_batch(
+            request.queries, request.max_results
+        ):
+            total = sum(len(urls) for urls in results.values())
+            row: Dict[str, Any] = {"query": query, "results": results, "total": total}
+            if error is not None:
+                row["error"] = str(error)
+            yield json.dumps(row) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.get("/api/search/stream")
+async def search_stream(
+    query: str = Query(..., description="Company name to search for"),
+    max_results: int = Query(
+        100, ge=1, le=200, description="Maximum number of results"
+    ),
+    format: str = Query(
+        "ndjson", pattern="^(ndjson|sse)$", description="Stream format: ndjson or sse"
+    ),
+):
+    """
+    Stream categorized results as they arrive, then a final ranked snapshot.
+
+    Emits ``result`` events (category, url, priority) while the upstream is
+    being consumed, an ``error`` event if it fails part-way, and always ends
+    with a ``ranked`` event shaped like the /api/search response.
+    """
+
+    async def stream() -> AsyncIterator[str]:
+        async for event in iter_search_events_async(query, max_results):
+            data = json.dumps(event)
+            if format == "sse":
+                yield f"event: {event['event']}\ndata: {data}\n\n"
+            else:
+                yield data + "\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type)
 
 
 @app.get("/api/vat/{vat_number}", response_model=VATInfo)
-def get_vat_info(
+async def get_vat_info(
     vat_number: str,
     country: str = Query("IT", description="Default country code if not in VAT number"),
 ):
@@ -53,7 +360,131 @@ def get_vat_info(
     The VAT number can include the country code (e.g., IT12345678901) or just the number.
     """
     try:
-        result = validate_vat(vat_number, default_country=country)
-        return result
+        body = await validate_vat_json_async(vat_number, default_country=country)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error validating VAT: {str(e)}")
+    return Response(content=body, media_type="application/json")
+
+
+def _vat_from_item(item: Any) -> str:
+    """Extract a VAT number from a JSON batch item (string or object)."""
+    if isinstance(item, dict):
+        item = item.get("vat_number", "")
+    if not isinstance(item, str):
+        raise ValueError(f"expected a VAT number string, got {item!r}")
+    return item
+
+
+def _parse_vat_batch(body: bytes, content_type: str) -> List[str]:
+    """Read VAT numbers from a JSON array, NDJSON or CSV request body."""
+    text = body.decode("utf-8-sig")
+    media_type = content_type.split(";")[0].strip().lower()
+
+    if media_type in ("application/x-ndjson", "application/jsonl"):
+        return [
+            _vat_from_item(json.loads(line))
+            for line in text.splitlines()
+            if line.strip()
+        ]
+
+    if media_type == "text/csv":
+        rows = [row for row in csv.reader(io.StringIO(text)) if row and row[0].strip()]
+        # Skip a header row such as "vat_number,name"
+        if rows and rows[0][0].strip().lower() in ("vat", "vat_number", "partita_iva"):
+            rows = rows[1:]
+        return [row[0] for row in rows]
+
+    items = json.loads(text)
+    if not isinstance(items, list):
+        raise ValueError("expected a JSON array of VAT numbers")
+    return [_vat_from_item(item) for item in items]
+
+
+@app.post("/api/vat/batch")
+async def validate_vat_bulk(
+    request: Request,
+    country: str = Query("IT", description="Default country code if not in VAT number"),
+):
+    """
+    Validate a list of VAT numbers, streaming one VATInfo per line as NDJSON.
+
+    The body can be a JSON array, NDJSON (application/x-ndjson) or CSV (text/csv,
+    first column). Duplicates are validated once; results arrive in completion
+    order and failures are reported per item via ``error_message``.
+    """
+    try:
+        vat_inputs = _parse_vat_batch(
+            await request.body(), request.headers.get("content-type", "")
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {str(e)}")
+
+    if len(vat_inputs) > VIES_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(vat_inputs)} > {VIES_BATCH_MAX_ITEMS} items",
+        )
+
+    async def stream() -> AsyncIterator[str]:
+        async for info in validate_vat_batch(vat_inputs, default_country=country):
+            yield info.model_dump_json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# VIES placeholder for member states that don't disclose company names
+_UNDISCLOSED_NAMES = ("", "---")
+
+
+@app.get("/api/company/{vat_number}", response_model=CompanyProfile)
+async def company_profile(
+    vat_number: str,
+    country: str = Query("IT", description="Default country code if not in VAT number"),
+    max_results: int = Query(
+        100, ge=1, le=200, description="Maximum number of results per search"
+    ),
+):
+    """
+    Validate a VAT number and search for the company in one call.
+
+    A search for the VAT number itself starts right away, in parallel with the
+    VIES lookup; once VIES returns the registered company name, that name is
+    searched too. Name results come first, then VAT-number hits on new domains.
+    If only the VAT-number search fails, the name results are returned alone.
+    Numbers failing the offline format check are answered without searching.
+    """
+    country_code, number = parse_vat_input(vat_number, country)
+    rejected = precheck_vat(country_code, number)
+    if rejected is not None:
+        return CompanyProfile(vat=rejected, results={}, total=0)
+    vat_search = asyncio.ensure_future(
+        search_companies_async(f"{country_code}{number}", max_results)
+    )
+
+    try:
+        vat = await validate_vat_async(vat_number, default_country=country)
+    except Exception as e:
+        vat_search.cancel()
+        raise HTTPException(status_code=500, detail=f"Error validating VAT: {str(e)}")
+
+    name_results: Dict[str, List[str]] = {}
+    company_name = (vat.company_name or "").strip()
+    searched_name = company_name not in _UNDISCLOSED_NAMES
+    if searched_name:
+        try:
+            name_results = await search_companies_async(company_name, max_results)
+        except SearchError:
+            vat_search.cancel()
+            raise
+
+    try:
+        vat_results = await vat_search
+    except SearchError:
+        # The VAT-number search only adds hits: keep what the name search found
+        if not searched_name:
+            raise
+        vat_results = {}
+
+    results = merge_results(name_results, vat_results)
+    total = sum(len(urls) for urls in results.values())
+    return CompanyProfile(vat=vat, results=results, total=total)
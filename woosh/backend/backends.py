@@ -0,0 +1,214 @@
+"""
+Search backends - where raw web results come from.
+
+Every backend returns DDGS-shaped result dicts (at least an ``href`` key), so
+search.py can classify and rank them the same way whichever engine answered.
+"""
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import (
+    SEARCH_FEDERATION_DEADLINE,
+    SEARCH_FIXTURE_PATH,
+    SEARCH_MAX_CONCURRENCY,
+)
+from metrics import is_rate_limit
+
+logger = logging.getLogger(__name__)
+
+# The DDGS client class, imported on first search (see _ddgs) so processes that
+# never query DDGS don't pay for its HTTP stack
+DDGS: Any = None
+
+Result = Dict[str, Any]
+
+
+def _ddgs() -> Any:
+    global DDGS
+    if DDGS is None:
+        from ddgs import DDGS
+    return DDGS
+
+
+class SearchBackend:
+    """Base class for search backends."""
+
+    name = "backend"
+
+    def search(
+        self, query: str, max_results: int, timeout: int, page: int = 1
+    ) -> List[Result]:
+        """Return up to ``max_results`` results for one page of ``query``.
+
+        Callers paging through a query pass the same ``max_results`` (the page
+        size) for every page. Raises when the upstream fails or has nothing
+        for this page.
+        """
+        raise NotImplementedError
+
+
+class DDGSBackend(SearchBackend):
+    """DDGS metasearch, optionally pinned to one engine (e.g. 'bing', 'brave')."""
+
+    def __init__(self, engine: Optional[str] = None):
+        self.engine = engine
+        self.name = f"ddgs:{engine}" if engine else "ddgs"
+
+    def search(
+        self, query: str, max_results: int, timeout: int, page: int = 1
+    ) -> List[Result]:
+        kwargs: Dict[str, Any] = {"max_results": max_results}
+        if page > 1:
+            kwargs["page"] = page
+        if self.engine:
+            kwargs["backend"] = self.engine
+        with _ddgs()(timeout=timeout) as ddgs:
+            return ddgs.text(query, **kwargs)
+
+
+class FixtureBackend(SearchBackend):
+    """Serves canned results from a local JSON file (tests, offline dev).
+
+    The file maps normalized queries to result lists; the ``"*"`` entry, if
+    present, answers any other query.
+    """
+
+    name = "fixture"
+
+    def __init__(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            fixtures = json.load(f)
+        self._fixtures: Dict[str, List[Result]] = {
+            " ".join(query.casefold().split()): results
+            for query, results in fixtures.items()
+        }
+
+    def search(
+        self, query: str, max_results: int, timeout: int, page: int = 1
+    ) -> List[Result]:
+        key = " ".join(query.casefold().split())
+        results = self._fixtures.get(key, self._fixtures.get("*", []))
+        start = (page - 1) * max_results
+        batch = results[start : start + max_results]
+        if not batch:
+            raise LookupError(f"No fixture results for '{query}' (page {page})")
+        return batch
+
+
+class FederatedBackend(SearchBackend):
+    """Query several backends in parallel and merge what arrives by a deadline.
+
+    Results are interleaved rank by rank across backends (in configuration
+    order) and exact duplicate URLs dropped; base-domain dedup happens later
+    in the search pipeline. Slow backends are left behind, failing ones are
+    skipped, and only if none answered does the search fail - with a
+    backend's rate-limit error if there was one.
+
+    Each backend gets its own pool of ``max_concurrency`` threads, so calls
+    stuck on a stalled engine can't hold up the others; calls still queued at
+    the deadline are cancelled. ``on_throttle(backend, error)`` is told when
+    a backend is throttled while others still answered.
+    """
+
+    name = "federated"
+
+    def __init__(
+        self,
+        backends: Sequence[SearchBackend],
+        deadline: float = SEARCH_FEDERATION_DEADLINE,
+        max_concurrency: int = SEARCH_MAX_CONCURRENCY,
+        on_throttle: Optional[Callable[[SearchBackend, Exception], None]] = None,
+    ):
+        self.backends = list(backends)
+        self.deadline = deadline
+        self.on_throttle = on_throttle
+        self._executors = [
+            ThreadPoolExecutor(
+                max_workers=max_concurrency, thread_name_prefix="woosh-federation"
+            )
+            for _ in self.backends
+        ]
+
+    def search(
+        self, query: str, max_results: int, timeout: int, page: int = 1
+    ) -> List[Result]:
+        futures = [
+            executor.submit(backend.search, query, max_results, timeout, page)
+            for backend, executor in zip(self.backends, self._executors)
+        ]
+        done, _ = wait(futures, timeout=self.deadline)
+
+        batches: List[List[Result]] = []
+        error: Optional[Exception] = None
+        throttled: List[Tuple[SearchBackend, Exception]] = []
+        for backend, future in zip(self.backends, futures):
+            if future not in done:
+                # Frees the slot if the call hasn't started; a running call
+                # keeps it until the backend's own timeout
+                future.cancel()
+                logger.info(f"Backend {backend.name} missed the deadline for '{query}'")
+                continue
+            try:
+                batches.append(future.result())
+            except Exception as e:
+                logger.info(f"Backend {backend.name} failed for '{query}': {e}")
+                if is_rate_limit(e):
+                    throttled.append((backend, e))
+                error = e
+
+        if not batches:
+            if throttled:
+                raise throttled[0][1]
+            if error is not None:
+                raise error
+            raise TimeoutError(f"No search backend answered within {self.deadline}s")
+        if self.on_throttle is not None:
+            for backend, e in throttled:
+                self.on_throttle(backend, e)
+
+        merged: List[Result] = []
+        seen_urls = set()
+        for rank in range(max(len(batch) for batch in batches)):
+            for batch in batches:
+                if rank < len(batch):
+                    url = batch[rank].get("href", "")
+                    if url in seen_urls:
+                        continue
+                    seen_urls.add(url)
+                    merged.append(batch[rank])
+        return merged[:max_results]
+
+
+def create_backend(spec: str) -> SearchBackend:
+    """Build a backend from a config spec.
+
+    Specs are 'ddgs', 'ddgs:<engine>' or 'fixture[:<path>]'.
+    """
+    name, _, arg = spec.strip().partition(":")
+    if name == "ddgs":
+        return DDGSBackend(arg or None)
+    if name == "fixture":
+        path = arg or SEARCH_FIXTURE_PATH
+        if not path:
+            raise ValueError("the fixture backend needs a path")
+        return FixtureBackend(path)
+    raise ValueError(f"Unknown search backend: {spec!r}")
+
+
+def create_search_backend(
+    specs: Sequence[str],
+    on_throttle: Optional[Callable[[SearchBackend, Exception], None]] = None,
+) -> SearchBackend:
+    """Build the configured backend, federating when more than one is listed.
+
+    ``on_throttle`` is passed to the :class:`FederatedBackend`, if any.
+    """
+    backends = [create_backend(spec) for spec in specs]
+    if not backends:
+        raise ValueError("no search backend configured")
+    if len(backends) == 1:
+        return backends[0]
+    return FederatedBackend(backends, on_throttle=on_throttle)
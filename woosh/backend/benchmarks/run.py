@@ -0,0 +1,353 @@
+"""
+Benchmarks for classification, search and the API endpoints.
+
+Runs entirely offline: search results are replayed from a fixture file (see
+``record``) or generated from the configured rules, and VIES is replaced by a
+local stub. Results are written as JSON so runs can be compared.
+
+Usage (from woosh/backend):
+    python benchmarks/run.py                          # run all, print results
+    python benchmarks/run.py --output results/a.json  # ...and save them
+    python benchmarks/run.py --compare results/a.json # fail on regressions
+    python benchmarks/run.py record "Ferrero" "Barilla" -o fixtures.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+# Backend modules are imported flat, as in app.py and the tests
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+import search  # noqa: E402
+import vies  # noqa: E402
+from app import app  # noqa: E402
+from backends import FixtureBackend  # noqa: E402
+from classify import classify_url  # noqa: E402
+from config import RULES  # noqa: E402
+from ratelimit import AdaptiveTokenBucket  # noqa: E402
+from vatcheck import _luhn_ok  # noqa: E402
+
+QUERIES = ["ferrero", "barilla", "luxottica", "pirelli", "lavazza", "benetton"]
+TLDS = ["it", "com", "eu", "de", "fr", "net", "org"]
+WORDS = ["acme", "rossi", "bianchi", "studio", "tech", "food", "moda", "casa"]
+
+Result = Dict[str, Any]
+
+
+# =============================================================================
+# CORPUS
+# =============================================================================
+
+
+def synthetic_urls(count: int, seed: int = 42) -> List[str]:
+    """URLs mixing rule hits (with random subdomains/paths) and unknown domains."""
+    rng = random.Random(seed)
+    literals = [
+        rule.pattern
+        for rules in RULES.values()
+        for rule in rules
+        if not rule.is_regex and "." in rule.pattern
+    ]
+    urls = []
+    for i in range(count):
+        if rng.random() < 0.5:
+            domain = rng.choice(["", "www.", "m.", "it."]) + rng.choice(literals)
+        else:
+            domain = f"{rng.choice(WORDS)}{i}.{rng.choice(TLDS)}"
+        urls.append(f"https://{domain}/{rng.choice(WORDS)}/{i}")
+    return urls
+
+
+def synthetic_vat_numbers(count: int) -> List[str]:
+    """Distinct Italian VAT numbers that pass the offline check digit test."""
+    numbers = []
+    for n in range(count):
+        # A non-zero company number (first 7 digits), or _check_it rejects it
+        body = f"{n + 10**8:010d}"
+        check = next(d for d in range(10) if _luhn_ok(f"{body}{d}"))
+        numbers.append(f"IT{body}{check}")
+    return numbers
+
+
+def synthetic_fixtures(per_query: int = 100, seed: int = 7) -> Dict[str, List[Result]]:
+    """Fixture-backend results for QUERIES, shaped like DDGS text results."""
+    fixtures = {}
+    # "*" answers the generated company names used by the endpoint benchmarks
+    for n, query in enumerate(QUERIES + ["*"]):
+        fixtures[query] = [
+            {"title": f"{query} {i}", "href": url, "body": ""}
+            for i, url in enumerate(synthetic_urls(per_query, seed + n))
+        ]
+    return fixtures
+
+
+class ReplayBackend(FixtureBackend):
+    """Fixture backend with a simulated upstream round trip per page."""
+
+    def __init__(self, path: str, latency: float):
+        super().__init__(path)
+        self.latency = latency
+
+    def search(self, query, max_results, timeout, page=1):
+        time.sleep(self.latency)
+        return super().search(query, max_results, timeout, page)
+
+
+class StubVIESService:
+    """Async VIES stand-in answering every number as valid after ``latency``."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def checkVat(self, countryCode: str, vatNumber: str):
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(
+            requestDate=date.today(), valid=True, name="ACME SRL", address="VIA ROMA 1"
+        )
+
+
+def _install_stubs(fixture_path: str, latency: float) -> None:
+    search._backend = ReplayBackend(fixture_path, latency)
+    # Measure our code, not the upstream pacing
+    search._upstream_limiter = AdaptiveTokenBucket(1e6)
+    client = vies._AsyncVIESClient.__new__(vies._AsyncVIESClient)
+    client.client = SimpleNamespace(service=StubVIESService(latency))
+    vies._async_vies_client = client
+
+
+def _clear_caches() -> None:
+    search._search_cache.clear()
+    vies._vat_cache.clear()
+
+
+# =============================================================================
+# MEASUREMENT
+# =============================================================================
+
+
+def measure(fn: Callable[[], Any], ops: int, repeat: int) -> Dict[str, float]:
+    """Run ``fn`` ``repeat`` times; each run performs ``ops`` operations."""
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        "ops": ops,
+        "best_s": round(best, 6),
+        "median_s": round(statistics.median(timings), 6),
+        "ops_per_sec": round(ops / best, 1),
+    }
+
+
+def bench_classify(urls: List[str], repeat: int) -> Dict[str, float]:
+    def run():
+        for url in urls:
+            classify_url(url)
+
+    return measure(run, len(urls), repeat)
+
+
+def bench_search(cached: bool, repeat: int) -> Dict[str, float]:
+    # Cache hits take microseconds: loop enough to be measurable
+    rounds = 200 if cached else 1
+
+    def run():
+        if not cached:
+            _clear_caches()
+        for _ in range(rounds):
+            for query in QUERIES:
+                search.search_companies(query)
+
+    return measure(run, rounds * len(QUERIES), repeat)
+
+
+def bench_endpoint(
+    paths: List[str], concurrency: int, cached: bool, repeat: int
+) -> Dict[str, float]:
+    async def fetch_all():
+        transport = httpx.ASGITransport(app=app)
+        semaphore = asyncio.Semaphore(concurrency)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+
+            async def get(path: str):
+                async with semaphore:
+                    response = await client.get(path)
+                    response.raise_for_status()
+
+            await asyncio.gather(*(get(path) for path in paths))
+
+    def run():
+        if not cached:
+            _clear_caches()
+        asyncio.run(fetch_all())
+
+    return measure(run, len(paths), repeat)
+
+
+def run_all(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    if args.fixtures:
+        _install_stubs(args.fixtures, args.upstream_latency)
+    else:
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as f:
+            json.dump(synthetic_fixtures(), f)
+            f.flush()
+            _install_stubs(f.name, args.upstream_latency)
+
+    urls = synthetic_urls(args.urls)
+    search_paths = [f"/api/search?query=company+{n}" for n in range(200)]
+    vat_paths = [f"/api/vat/{vat}" for vat in synthetic_vat_numbers(500)]
+
+    benchmarks = {
+        "classify_url": lambda: bench_classify(urls, args.repeat),
+        "search_companies_cold": lambda: bench_search(False, args.repeat),
+        "search_companies_cached": lambda: bench_search(True, args.repeat),
+        "api_search_cold": lambda: bench_endpoint(
+            search_paths, args.concurrency, False, args.repeat
+        ),
+        "api_search_cached": lambda: bench_endpoint(
+            search_paths, args.concurrency, True, args.repeat
+        ),
+        "api_vat_cold": lambda: bench_endpoint(
+            vat_paths, args.concurrency, False, args.repeat
+        ),
+        "api_vat_cached": lambda: bench_endpoint(
+            vat_paths, args.concurrency, True, args.repeat
+        ),
+    }
+
+    results = {}
+    for name, bench in benchmarks.items():
+        if args.only and not any(part in name for part in args.only):
+            continue
+        results[name] = bench()
+        print(f"{name:28} {results[name]['ops_per_sec']:>12,.1f} ops/s")
+    return results
+
+
+# =============================================================================
+# REPORTING
+# =============================================================================
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline_path: str, threshold: float
+) -> bool:
+    """Print throughput changes against a baseline; False if any regressed."""
+    baseline = json.loads(Path(baseline_path).read_text())["results"]
+    ok = True
+    print(f"\nCompared to {baseline_path}:")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        change = result["ops_per_sec"] / baseline[name]["ops_per_sec"] - 1
+        regressed = change < -threshold
+        ok = ok and not regressed
+        marker = "  REGRESSION" if regressed else ""
+        print(f"{name:28} {change:>+8.1%}{marker}")
+    return ok
+
+
+def record(queries: List[str], output: str, max_results: int) -> None:
+    """Record live DDGS responses into a fixture file for later replay."""
+    from backends import DDGSBackend
+
+    backend = DDGSBackend()
+    fixtures = {}
+    for query in queries:
+        results = backend.search(query, max_results, timeout=10)
+        fixtures[search.normalize_query(query)] = results
+        print(f"Recorded {len(results)} results for '{query}'")
+    Path(output).write_text(json.dumps(fixtures, indent=2))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["record"]:
+        parser = argparse.ArgumentParser(prog="run.py record")
+        parser.add_argument("queries", nargs="+")
+        parser.add_argument("-o", "--output", default="fixtures.json")
+        parser.add_argument("--max-results", type=int, default=100)
+        args = parser.parse_args(argv[1:])
+        record(args.queries, args.output, args.max_results)
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fixtures", help="Recorded search results to replay")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline results JSON to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Throughput drop counted as a regression (default: 0.2 = 20%%)",
+    )
+    parser.add_argument("--only", nargs="*", help="Run benchmarks matching these")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--urls", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--upstream-latency",
+        type=float,
+        default=0.005,
+        help="Simulated upstream round trip in seconds (default: 0.005)",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_all(args)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "settings": {
+                "repeat": args.repeat,
+                "urls": args.urls,
+                "concurrency": args.concurrency,
+                "upstream_latency": args.upstream_latency,
+                "fixtures": args.fixtures or "synthetic",
+            },
+            "results": results,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nSaved results to {args.output}")
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""
+TTL caches for upstream results - in-process LRU plus an optional SQLite store.
+
+Values are stored as encoded bytes (usually JSON) so the same entry can live
+in memory, on disk, or be shared across worker processes unchanged.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (value, absolute expiry timestamp)
+Entry = Tuple[bytes, float]
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a cache."""
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {**asdict(self), "hit_ratio": round(self.hit_ratio, 4)}
+
+
+class MemoryCache:
+    """Thread-safe in-process LRU with a per-entry TTL.
+
+    Bounded by entry count and, optionally, by the total size of the stored
+    values in bytes.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_entry(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set_entry(self, key: str, value: bytes, expires: float) -> None:
+        if self.max_bytes is not None and len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (value, expires)
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """Persistent TTL store in a local SQLite file, shareable across processes.
+
+    SQLite connections must not be used across ``fork()``, so each process
+    opens its own on first use: a cache built before a preforking server
+    forks its workers (``preload_app``) is safe to use in every worker.
+
+    Expired rows (and, with ``max_bytes``, the soonest-expiring rows over the
+    size budget) are purged periodically on write.
+    """
+
+    # Expired rows are purged every N writes
+    PURGE_EVERY = 500
+
+    def __init__(
+        self, path: str, table: str = "cache", max_bytes: Optional[int] = None
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        # A parent's connection, kept referenced so it is never finalized
+        # (closed) by a child process
+        self._inherited: Optional[sqlite3.Connection] = None
+        with self._lock, self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """This process's connection, opened on first use (call under _lock)."""
+        pid = os.getpid()
+        if self._conn is None or self._pid != pid:
+            if self._conn is not None:
+                self._inherited = self._conn
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            # Safe with WAL (a crash loses at most the last commits, never
+            # corrupts), and spares every write an fsync
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._pid = pid
+        return self._conn
+
+    def get_entry(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            row = (
+                self._connection()
+                .execute(
+                    f"SELECT value, expires FROM {self.table} WHERE key = ?", (key,)
+                )
+                .fetchone()
+            )
+        if row is None or row[1] <= time.time():
+            return None
+        return bytes(row[0]), row[1]
+
+    def set_entry(self, key: str, value: bytes, expires: float) -> None:
+        with self._lock, self._connection() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires) "
+                "VALUES (?, ?, ?)",
+                (key, value, expires),
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self._purge(conn)
+
+    def _purge(self, conn: sqlite3.Connection) -> None:
+        conn.execute(f"DELETE FROM {self.table} WHERE expires <= ?", (time.time(),))
+        if self.max_bytes is None:
+            return
+        (total,) = conn.execute(
+            f"SELECT COALESCE(SUM(LENGTH(value)), 0) FROM {self.table}"
+        ).fetchone()
+        while total > self.max_bytes:
+            # Drop the soonest-expiring tenth of the rows and re-measure
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM "
+                f"{self.table} ORDER BY expires LIMIT MAX(1, "
+                f"(SELECT COUNT(*) FROM {self.table}) / 10))"
+            )
+            (total,) = conn.execute(
+                f"SELECT COALESCE(SUM(LENGTH(value)), 0) FROM {self.table}"
+            ).fetchone()
+
+    def clear(self) -> None:
+        with self._lock, self._connection() as conn:
+            conn.execute(f"DELETE FROM {self.table}")
+
+    def close(self) -> None:
+        with self._lock:
+            # Only close a connection this process opened
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+                self._conn = None
+
+
+class TieredCache:
+    """Memory LRU in front of an optional persistent store, with hit/miss stats.
+
+    The store may block (SQLite waits up to its busy timeout for another
+    process's write lock), so coroutines use :meth:`get_async` and
+    :meth:`set_behind`, which keep store access off the event loop.
+    """
+
+    def __init__(self, memory: MemoryCache, store: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.store = store
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.peek(key)
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    def peek(self, key: str) -> Optional[bytes]:
+        """Like :meth:`get`, without counting a hit or miss."""
+        entry = self.memory.get_entry(key)
+        if entry is None and self.store is not None:
+            entry = self.store.get_entry(key)
+            if entry is not None:
+                # Promote to memory, keeping the original expiry
+                self.memory.set_entry(key, *entry)
+        return entry[0] if entry is not None else None
+
+    async def get_async(
+        self, key: str, executor: Optional[Executor] = None
+    ) -> Optional[bytes]:
+        """Like :meth:`get`, reading the store on ``executor`` (default pool).
+
+        Memory hits are answered inline, without leaving the event loop.
+        """
+        value = await self.peek_async(key, executor)
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    async def peek_async(
+        self, key: str, executor: Optional[Executor] = None
+    ) -> Optional[bytes]:
+        """Like :meth:`get_async`, without counting a hit or miss."""
+        entry = self.memory.get_entry(key)
+        if entry is not None:
+            return entry[0]
+        if self.store is None:
+            return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.peek, key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        expires = time.time() + ttl
+        self.memory.set_entry(key, value, expires)
+        if self.store is not None:
+            self.store.set_entry(key, value, expires)
+
+    def set_behind(
+        self, key: str, value: bytes, ttl: float, executor: Optional[Executor] = None
+    ) -> None:
+        """Like :meth:`set`, writing the store in the background on ``executor``.
+
+        The entry is in memory on return; the store write is not waited for,
+        and a failed one is only logged (the value is a cache entry after all).
+        Call from a coroutine.
+        """
+        if ttl <= 0:
+            return
+        expires = time.time() + ttl
+        self.memory.set_entry(key, value, expires)
+        if self.store is not None:
+            loop = asyncio.get_running_loop()
+            write = loop.run_in_executor(
+                executor, self.store.set_entry, key, value, expires
+            )
+            write.add_done_callback(_log_write_failure)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.store is not None:
+            self.store.clear()
+        self.stats = CacheStats()
+
+
+def _log_write_failure(write: "asyncio.Future[None]") -> None:
+    if not write.cancelled() and write.exception() is not None:
+        logger.warning(f"Cache store write failed: {write.exception()}")
+
+
+class LRUMemo:
+    """Thread-safe bounded LRU of plain Python values, with hit/miss stats.
+
+    For memoizing cheap-to-store results of pure functions (no TTL and no
+    encoding, unlike the upstream result caches).
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry (the stats keep counting)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def create_cache(
+    backend: str,
+    table: str,
+    max_entries: int = 10000,
+    max_bytes: Optional[int] = None,
+    path: Optional[str] = None,
+) -> TieredCache:
+    """Build a cache for the configured backend.
+
+    Args:
+        backend: 'memory' (per process) or 'sqlite' (memory LRU in front of a
+            SQLite file shared by all workers on the host)
+        table: Namespace of this cache inside a shared SQLite file
+        max_entries: Maximum entries kept in memory
+        max_bytes: Maximum total size of cached values, in bytes
+        path: SQLite file path (required for the 'sqlite' backend)
+
+    Returns:
+        TieredCache for the selected backend
+    """
+    memory = MemoryCache(max_entries, max_bytes)
+    if backend == "memory":
+        return TieredCache(memory)
+    if backend == "sqlite":
+        if not path:
+            raise ValueError("the sqlite cache backend needs a path")
+        return TieredCache(memory, SQLiteCache(path, table, max_bytes))
+    raise ValueError(f"Unknown cache backend: {backend!r}")
@@ -0,0 +1,112 @@
+"""
+Circuit breakers for flaky upstreams (e.g. one VIES member state being down).
+
+After ``failure_threshold`` consecutive failures the circuit opens and calls
+fail fast for ``reset_timeout`` seconds. Then a single probe is let through
+(half-open): success closes the circuit, failure opens it again.
+"""
+
+import threading
+import time
+from typing import Callable, Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker, safe to share across threads."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = CLOSED
+        # When the half-open probe was let through; a probe that never reports
+        # back (cancelled caller) is replaced after reset_timeout
+        self._probe_started = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._cooled_down():
+                return HALF_OPEN
+            return self._state
+
+    def _cooled_down(self) -> bool:
+        return self._clock() - self._opened_at >= self.reset_timeout
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now (the caller must report back)."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if not self._cooled_down():
+                    return False
+                self._state = HALF_OPEN
+                self._probing = False
+            now = self._clock()
+            if self._probing and now - self._probe_started < self.reset_timeout:
+                return False
+            self._probing = True
+            self._probe_started = now
+            return True
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a probe through (0 if it would)."""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._state = CLOSED
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+class KeyedCircuitBreaker:
+    """One :class:`CircuitBreaker` per key (e.g. per VIES member state)."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, key: str) -> CircuitBreaker:
+        """Get or create the breaker for ``key``."""
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers.setdefault(
+                key, CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            )
+        return breaker
+
+    def states(self) -> Dict[str, str]:
+        """Current state of every breaker, by key."""
+        return {key: breaker.state for key, breaker in self._breakers.items()}
+
+    def clear(self) -> None:
+        self._breakers.clear()
@@ -42,15 +42,169 @@ URL classification based on predefined rules.
 
 """
 
+import asyncio
+import logging
+import os
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
 from urllib.parse import urlparse
 
-from config import RULES
+from cache import LRUMemo
+from config import DOMAIN_MEMO_SIZE, RULES_FILE, Rule
+from domains import hostname
+from metrics import register_cache
+from rules import RuleSet, builtin_rules, load_rules
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATEGORY = "altro"
+
+# The active rule set. Reloads build a new RuleSet and swap this reference, so
+# callers holding the previous one (a search in flight) finish with it.
+_active: RuleSet = load_rules(RULES_FILE) if RULES_FILE else builtin_rules()
+_reload_lock = threading.Lock()
+
+
+class Classification(NamedTuple):
+    """Category, priority and the rule that produced them."""
+
+    category: str
+    priority: int
+    matched_rule: Optional[Rule]
+
+
+_UNMATCHED = Classification(DEFAULT_CATEGORY, 0, None)
+
+# host -> (rule set, excluded, classification). Entries remember the rule set
+# that produced them, so a search still holding old rules can't poison the memo
+_domain_memo = LRUMemo(DOMAIN_MEMO_SIZE)
+
+register_cache("domains", _domain_memo)
+
+
+def active_rules() -> RuleSet:
+    """The rule set new classifications use."""
+    return _active
+
+
+def set_rules(ruleset: RuleSet) -> RuleSet:
+    """Atomically make ``ruleset`` the active one; returns the previous one."""
+    global _active
+    previous, _active = _active, ruleset
+    _domain_memo.clear()
+    logger.info(f"Rules {previous.version} -> {ruleset.version}")
+    return previous
+
+
+def reload_rules(path: Optional[str] = None) -> RuleSet:
+    """
+    Load a rule file and swap it in.
+
+    The file is parsed and compiled before the swap, so a bad file leaves
+    the active rules untouched.
+
+    Args:
+        path: Rule file to load (default: ``RULES_FILE``, or the built-in
+            rules if none is configured)
+
+    Raises:
+        RulesError: the file is missing or invalid
+    """
+    with _reload_lock:
+        if path is None:
+            path = RULES_FILE
+        ruleset = load_rules(path) if path else builtin_rules()
+        set_rules(ruleset)
+        return ruleset
+
+
+async def watch_rules_file(path: str, interval: float) -> None:
+    """Reload ``path`` whenever its modification time or size changes.
+
+    Parsing and compiling run on a worker thread, so requests keep being
+    served with the old rules meanwhile. Invalid files are logged and skipped.
+    """
+    loop = asyncio.get_running_loop()
+
+    def signature():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    seen = signature()
+    while True:
+        await asyncio.sleep(interval)
+        current = signature()
+        if current is None or current == seen:
+            continue
+        seen = current
+        try:
+            await loop.run_in_executor(None, reload_rules, path)
+        except Exception as e:
+            logger.error(f"Keeping rules {_active.version}: reload failed: {e}")
+
+
+def _classify_uncached(domain: str, rules: RuleSet) -> Classification:
+    match = rules.match(domain)
+    if match is None:
+        return _UNMATCHED
+    category, rule = match
+    return Classification(category, rule.priority, rule)
+
+
+def lookup_domain(
+    domain: str, rules: Optional[RuleSet] = None
+) -> Tuple[bool, Classification]:
+    """
+    Whether a domain (netloc) is excluded, and its classification.
+
+    Results for the active rule set are memoized per host (lowercased, port
+    and credentials dropped), so domains that recur across searches are
+    matched once.
+
+    Args:
+        domain: Domain (netloc) to look up
+        rules: Rule set to use (default: the active one)
+
+    Returns:
+        Tuple of (excluded, classification)
+    """
+    if rules is None:
+        rules = _active
+    domain = hostname(domain)
+    entry = _domain_memo.get(domain)
+    if entry is not None and entry[0] is rules:
+        return entry[1], entry[2]
+
+    excluded = rules.is_excluded(domain)
+    classification = _classify_uncached(domain, rules)
+    if rules is _active:
+        _domain_memo.set(domain, (rules, excluded, classification))
+    return excluded, classification
+
+
+def domain_memo_stats() -> Dict[str, float]:
+    """Hit/miss counters of the per-domain classification memo."""
+    return {**_domain_memo.stats.as_dict(), "entries": len(_domain_memo)}
+
+
+def classify_domain(domain: str, rules: Optional[RuleSet] = None) -> Classification:
+    """Classify an already extracted domain (netloc), memoized per rule set."""
+    return lookup_domain(domain, rules)[1]
+
+
+def classify(url: str) -> Classification:
+    """Classify a URL, returning category, priority and matched rule."""
+    return classify_domain(urlparse(url).netloc.lower())
+
+
+def max_priority(category: str, rules: Optional[RuleSet] = None) -> int:
+    """Highest priority any rule of ``category`` can assign (0 for 'altro')."""
+    return (rules or _active).max_priority(category)
 
 
 def classify_url(url: str) -> str:
     """Classify a URL into a category based on predefined rules."""
-    domain = urlparse(url).netloc.lower()
-    for category, rules in RULES.items():
-        if any(rule.matches(domain) for rule in rules):
-            return category
-    return "altro"  # Default category if no match found
+    return classify(url).category
@@ -2,6 +2,7 @@
 Configuration for company finder - simple, powerful, no BS.
 """
 
+import os
 import re
 from dataclasses import dataclass
 from typing import Pattern
@@ -11,9 +12,21 @@ from typing import Pattern
 # =============================================================================
 
 
+def label_bounded(domain: str) -> str:
+    """Frame a domain so literal rules only match whole labels: '.www.ft.com.$'."""
+    return f".{domain.lower()}.$"
+
+
 @dataclass
 class Rule:
-    """Simple pattern rule with regex support."""
+    """Simple pattern rule with regex support.
+
+    Literal patterns match whole domain labels. Dotted patterns are domain
+    suffixes: 'ft.com' matches 'ft.com' and 'www.ft.com' but not
+    'microsoft.com' or 'ft.com.example.org'. A dotless pattern matches that
+    label anywhere ('yellowpages' matches 'www.yellowpages.ca'), unless it
+    has a leading dot ('.local'), which anchors it at the end too.
+    """
 
     pattern: str
     is_regex: bool = False
@@ -24,10 +37,18 @@ class Rule:
         if self.is_regex:
             self._compiled = re.compile(self.pattern, re.IGNORECASE)
 
+    @property
+    def key(self) -> str:
+        """The literal pattern as found in :func:`label_bounded` domains."""
+        pattern = self.pattern.lower()
+        label = pattern.strip(".")
+        end = ".$" if "." in label or pattern.startswith(".") else "."
+        return f".{label}{end}"
+
     def matches(self, domain: str) -> bool:
         if self._compiled:
             return bool(self._compiled.search(domain.lower()))
-        return self.pattern.lower() in domain.lower()
+        return self.key in label_bounded(domain)
 
 
 # =============================================================================
@@ -354,3 +375,137 @@ EXCLUDED = [
     Rule("manta.com", priority=8),
     Rule("thumbtack.com", priority=8),
 ]
+
+
+# =============================================================================
+# RUNTIME SETTINGS - overridable via environment variables
+# =============================================================================
+
+# Rule file (JSON, YAML or TOML, see rules.py) replacing RULES/EXCLUDED above.
+# The server re-reads it when it changes, polling every RULES_WATCH_INTERVAL
+# seconds (0 disables polling; POST /api/admin/rules/reload still works)
+RULES_FILE = os.environ.get("WOOSH_RULES_FILE") or None
+RULES_WATCH_INTERVAL = float(os.environ.get("WOOSH_RULES_WATCH_INTERVAL", "5"))
+
+# Bearer token for the admin endpoints (POST /api/admin/rules/reload); they
+# are disabled while it is unset
+ADMIN_TOKEN = os.environ.get("WOOSH_ADMIN_TOKEN") or None
+
+# Public Suffix List used to find registrable domains (vendored copy by default)
+PUBLIC_SUFFIX_LIST = os.environ.get(
+    "WOOSH_PUBLIC_SUFFIX_LIST",
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "psl", "public_suffix_list.dat"
+    ),
+)
+
+# Per-domain classification memo (entries); the same few domains recur in
+# nearly every search. Cleared when the rules change; 0 disables it
+DOMAIN_MEMO_SIZE = int(os.environ.get("WOOSH_DOMAIN_MEMO_SIZE", "20000"))
+
+# Max concurrent upstream searches; extra async callers wait as coroutines
+SEARCH_MAX_CONCURRENCY = int(os.environ.get("WOOSH_SEARCH_MAX_CONCURRENCY", "8"))
+
+# VIES SOAP calls: per-call timeout (seconds) and pooled keep-alive connections
+VIES_TIMEOUT = float(os.environ.get("WOOSH_VIES_TIMEOUT", "10"))
+VIES_MAX_CONNECTIONS = int(os.environ.get("WOOSH_VIES_MAX_CONNECTIONS", "20"))
+
+# VIES transient faults (member state unavailable, timeouts): retries with
+# jittered exponential backoff (base delay in seconds), then a per-country
+# circuit that opens after N consecutive failed lookups and fails fast for a
+# cooldown (seconds) before probing the member state again
+VIES_RETRIES = int(os.environ.get("WOOSH_VIES_RETRIES", "2"))
+VIES_RETRY_BACKOFF = float(os.environ.get("WOOSH_VIES_RETRY_BACKOFF", "0.5"))
+VIES_BREAKER_THRESHOLD = int(os.environ.get("WOOSH_VIES_BREAKER_THRESHOLD", "3"))
+VIES_BREAKER_COOLDOWN = float(os.environ.get("WOOSH_VIES_BREAKER_COOLDOWN", "30"))
+
+# VIES WSDL: the vendored copy by default, so startup needs no network. Point
+# it at the live URL to track upstream changes; remote WSDLs are kept in zeep's
+# SQLite cache for VIES_WSDL_CACHE_TTL seconds
+# (live: https://ec.europa.eu/taxation_customs/vies/checkVatService.wsdl)
+VIES_WSDL = os.environ.get(
+    "WOOSH_VIES_WSDL",
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "wsdl", "checkVatService.wsdl"
+    ),
+)
+VIES_WSDL_CACHE_PATH = os.environ.get(
+    "WOOSH_VIES_WSDL_CACHE_PATH", os.path.expanduser("~/.cache/woosh/zeep.db")
+)
+VIES_WSDL_CACHE_TTL = int(os.environ.get("WOOSH_VIES_WSDL_CACHE_TTL", "2592000"))
+
+# Bulk VAT validation: parallel VIES calls per batch, per-country request rate
+# (requests/second) shared by all batches, and the maximum batch size
+VIES_BATCH_CONCURRENCY = int(os.environ.get("WOOSH_VIES_BATCH_CONCURRENCY", "10"))
+VIES_COUNTRY_RATE = float(os.environ.get("WOOSH_VIES_COUNTRY_RATE", "5"))
+VIES_BATCH_MAX_ITEMS = int(os.environ.get("WOOSH_VIES_BATCH_MAX_ITEMS", "10000"))
+
+# Reject VAT numbers with a wrong format or check digit locally (see vatcheck.py)
+# instead of asking VIES; set to 0 if a country's rule turns out too strict
+VAT_LOCAL_CHECK = os.environ.get("WOOSH_VAT_LOCAL_CHECK", "1") != "0"
+
+# VIES result cache: TTL (seconds) per outcome, in-memory size, and an optional
+# SQLite file so results survive restarts and are shared between workers
+VAT_CACHE_TTL_VALID = float(os.environ.get("WOOSH_VAT_CACHE_TTL_VALID", "604800"))
+VAT_CACHE_TTL_INVALID = float(os.environ.get("WOOSH_VAT_CACHE_TTL_INVALID", "86400"))
+VAT_CACHE_TTL_ERROR = float(os.environ.get("WOOSH_VAT_CACHE_TTL_ERROR", "60"))
+VAT_CACHE_MAX_ENTRIES = int(os.environ.get("WOOSH_VAT_CACHE_MAX_ENTRIES", "10000"))
+VAT_CACHE_PATH = os.environ.get("WOOSH_VAT_CACHE_PATH") or None
+
+# Search result cache: backend ("memory" per process, or "sqlite" shared by all
+# workers on the host), TTL in seconds and size bound in bytes
+SEARCH_CACHE_BACKEND = os.environ.get("WOOSH_SEARCH_CACHE_BACKEND", "memory")
+SEARCH_CACHE_PATH = os.environ.get(
+    "WOOSH_SEARCH_CACHE_PATH", os.path.expanduser("~/.cache/woosh/cache.db")
+)
+SEARCH_CACHE_TTL = float(os.environ.get("WOOSH_SEARCH_CACHE_TTL", "3600"))
+SEARCH_CACHE_MAX_BYTES = int(
+    os.environ.get("WOOSH_SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+)
+
+# Results requested per upstream page when streaming / stopping early
+SEARCH_PAGE_SIZE = int(os.environ.get("WOOSH_SEARCH_PAGE_SIZE", "20"))
+
+# Search backends, comma separated: "ddgs", "ddgs:<engine>" (e.g. ddgs:bing,
+# ddgs:brave) or "fixture:<path.json>". Listing several queries them in
+# parallel and merges whatever has arrived by the federation deadline (seconds)
+SEARCH_BACKENDS = [
+    spec.strip()
+    for spec in os.environ.get("WOOSH_SEARCH_BACKENDS", "ddgs").split(",")
+    if spec.strip()
+]
+SEARCH_FEDERATION_DEADLINE = float(
+    os.environ.get("WOOSH_SEARCH_FEDERATION_DEADLINE", "5")
+)
+SEARCH_FIXTURE_PATH = os.environ.get("WOOSH_SEARCH_FIXTURE_PATH") or None
+
+# Upstream search pacing: at most SEARCH_RATE backend calls/second, halved on
+# each rate-limit response (down to SEARCH_RATE / 16) with an exponential pause
+# starting at SEARCH_BACKOFF seconds, then recovering on success. Throttled
+# calls are retried up to SEARCH_RETRIES times; a caller that would queue
+# longer than SEARCH_QUEUE_MAX_WAIT seconds is refused (HTTP 429)
+SEARCH_RATE = float(os.environ.get("WOOSH_SEARCH_RATE", "5"))
+SEARCH_BACKOFF = float(os.environ.get("WOOSH_SEARCH_BACKOFF", "1"))
+SEARCH_BACKOFF_MAX = float(os.environ.get("WOOSH_SEARCH_BACKOFF_MAX", "60"))
+SEARCH_RETRIES = int(os.environ.get("WOOSH_SEARCH_RETRIES", "2"))
+SEARCH_QUEUE_MAX_WAIT = float(os.environ.get("WOOSH_SEARCH_QUEUE_MAX_WAIT", "10"))
+
+# Batch company search: parallel searches per batch, upstream searches/second
+# across all batches (cache hits are free), and the maximum batch size
+SEARCH_BATCH_CONCURRENCY = int(os.environ.get("WOOSH_SEARCH_BATCH_CONCURRENCY", "4"))
+SEARCH_BATCH_RATE = float(os.environ.get("WOOSH_SEARCH_BATCH_RATE", "2"))
+SEARCH_BATCH_MAX_ITEMS = int(os.environ.get("WOOSH_SEARCH_BATCH_MAX_ITEMS", "1000"))
+
+# Production server (gunicorn.conf.py, `python start.py --prod`): listen
+# address, worker processes (default: one per CPU), requests after which a
+# worker is recycled (plus up to SERVER_MAX_REQUESTS_JITTER, so workers don't
+# all restart together; 0 disables recycling), and seconds a worker gets to
+# finish in-flight requests on shutdown or restart
+SERVER_HOST = os.environ.get("WOOSH_SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.environ.get("WOOSH_SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.environ.get("WOOSH_SERVER_WORKERS", "0")) or os.cpu_count() or 1
+SERVER_MAX_REQUESTS = int(os.environ.get("WOOSH_SERVER_MAX_REQUESTS", "10000"))
+SERVER_MAX_REQUESTS_JITTER = int(
+    os.environ.get("WOOSH_SERVER_MAX_REQUESTS_JITTER", "1000")
+)
+SERVER_GRACEFUL_TIMEOUT = float(os.environ.get("WOOSH_SERVER_GRACEFUL_TIMEOUT", "30"))
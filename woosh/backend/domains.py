@@ -0,0 +1,109 @@
+"""
+Host names and registrable domains, using the Public Suffix List.
+
+The list is vendored in ``psl/public_suffix_list.dat`` (no network access;
+refresh it from https://publicsuffix.org/list/public_suffix_list.dat) and
+compiled once, on first use, into a trie of reversed labels, so finding the
+registrable domain of a host costs one dict lookup per label.
+
+    >>> registrable_domain("shop.example.co.uk")
+    'example.co.uk'
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from config import PUBLIC_SUFFIX_LIST
+
+# Trie node markers (labels never contain these characters)
+_RULE = "\0rule"
+_EXCEPTION = "\0exception"
+
+Node = Dict[str, "Node"]
+
+
+class PublicSuffixList:
+    """Public Suffix List rules compiled into a trie of reversed labels."""
+
+    def __init__(self, lines: Iterable[str]):
+        self._root: Node = {}
+        for line in lines:
+            # Rules end at the first whitespace; '//' starts a comment line
+            rule = line.split(None, 1)[0] if line.strip() else ""
+            if rule and not rule.startswith("//"):
+                self._add(rule.lower())
+
+    @classmethod
+    def from_file(cls, path: str) -> "PublicSuffixList":
+        with open(path, encoding="utf-8") as f:
+            return cls(f)
+
+    def _add(self, rule: str) -> None:
+        exception = rule.startswith("!")
+        node = self._root
+        for label in reversed(rule.lstrip("!").split(".")):
+            node = node.setdefault(label, {})
+        node[_EXCEPTION if exception else _RULE] = {}
+
+    def suffix_labels(self, labels: List[str]) -> int:
+        """How many trailing labels form the public suffix (at least 1)."""
+        # Unlisted TLDs are public suffixes too (the implicit "*" rule)
+        suffix = 1
+        node = self._root
+        for depth, label in enumerate(reversed(labels)):
+            wildcard = node.get("*")
+            child = node.get(label)
+            if child is not None and _EXCEPTION in child:
+                # "!www.ck": the exception's parent is the suffix
+                return depth
+            if wildcard is not None and _RULE in wildcard:
+                suffix = depth + 1
+            if child is None:
+                break
+            if _RULE in child:
+                suffix = depth + 1
+            node = child
+        return suffix
+
+    def registrable_domain(self, host: str) -> Optional[str]:
+        """The public suffix plus one label, or None if ``host`` has none."""
+        labels = host.split(".")
+        suffix = self.suffix_labels(labels)
+        if len(labels) <= suffix:
+            return None
+        return ".".join(labels[-suffix - 1 :])
+
+
+_psl: Optional[PublicSuffixList] = None
+_psl_lock = threading.Lock()
+
+
+def public_suffix_list() -> PublicSuffixList:
+    """The vendored list, compiled on first use."""
+    global _psl
+    if _psl is None:
+        with _psl_lock:
+            if _psl is None:
+                _psl = PublicSuffixList.from_file(PUBLIC_SUFFIX_LIST)
+    return _psl
+
+
+def hostname(netloc: str) -> str:
+    """Lowercased host of a URL netloc, without credentials, port or final dot."""
+    host = netloc.rpartition("@")[2].lower()
+    if host.startswith("["):
+        # IPv6 literal
+        return host.partition("]")[0] + "]"
+    return host.partition(":")[0].rstrip(".")
+
+
+def registrable_domain(host: str) -> str:
+    """
+    The registrable domain of ``host``: its public suffix plus one label.
+
+    IP addresses, single labels and public suffixes themselves are returned
+    unchanged.
+    """
+    if not host or host.startswith("[") or host[-1].isdigit():
+        return host
+    return public_suffix_list().registrable_domain(host) or host
@@ -0,0 +1,29 @@
+"""
+JSON encoding for the hot paths: orjson when installed, the standard library
+otherwise.
+
+Both produce compact UTF-8 bytes, so cached entries encoded by either can be
+served as response bodies unchanged.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional, see the "prod" extra
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode ``obj`` as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(data: bytes) -> Any:
+    """Decode JSON bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
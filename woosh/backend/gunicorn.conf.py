@@ -0,0 +1,56 @@
+"""
+Gunicorn settings for production: preforked uvicorn workers.
+
+Usage (from woosh/backend, or via `make serve` / `python start.py --prod`):
+    gunicorn app:app -c gunicorn.conf.py
+
+The app is imported once in the master and workers are forked from it, so the
+compiled rules, the Public Suffix List and the parsed VIES WSDL are shared
+copy-on-write. Uvicorn workers use uvloop and httptools when installed (both
+come with ``uvicorn[standard]``). SQLite caches opened in the master reconnect
+in each worker on first use (see ``cache.SQLiteCache``).
+
+Signals: HUP starts fresh workers and retires the old ones gracefully (code is
+not re-imported, as it is preloaded); USR2 then QUIT on the old master
+upgrades to new code without dropping connections.
+"""
+
+import gc
+import os
+import sys
+
+# Settings live in config.py with the rest of the WOOSH_* variables
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import (  # noqa: E402
+    SERVER_GRACEFUL_TIMEOUT,
+    SERVER_HOST,
+    SERVER_MAX_REQUESTS,
+    SERVER_MAX_REQUESTS_JITTER,
+    SERVER_PORT,
+    SERVER_WORKERS,
+)
+
+bind = f"{SERVER_HOST}:{SERVER_PORT}"
+workers = SERVER_WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+max_requests = SERVER_MAX_REQUESTS
+max_requests_jitter = SERVER_MAX_REQUESTS_JITTER if SERVER_MAX_REQUESTS else 0
+graceful_timeout = SERVER_GRACEFUL_TIMEOUT
+# Searches can queue behind the upstream rate limiter: allow for that before
+# the master declares a worker hung
+timeout = 120
+keepalive = 5
+
+
+def when_ready(server):
+    """Build shared state in the master, after the app import, before forking."""
+    from app import preload
+
+    preload()
+    # Keep the preloaded objects out of future collections: the collector
+    # writing to their headers would copy the shared pages into every worker
+    gc.freeze()
+    server.log.info(f"Preloaded app state, starting {workers} workers")
@@ -0,0 +1,108 @@
+"""
+Compiled rule matcher - one pass over the domain instead of one scan per Rule.
+
+Literal patterns are folded into an Aho-Corasick automaton, so every literal
+rule is checked in a single walk over the domain characters (framed by
+:func:`config.label_bounded`, so literals only match whole labels, and dotted
+ones only at the end of the domain). Regex rules are
+few and are only evaluated when they could still beat the best literal hit.
+"""
+
+from collections import deque
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from config import Rule, label_bounded
+
+# Sentinel ordinal meaning "no rule matched"
+_NO_MATCH = 1 << 30
+
+
+class RuleMatcher:
+    """Match a domain against an ordered mapping of category -> rules.
+
+    The result is the same as walking the categories in order and returning
+    the first rule that matches (i.e. the old nested ``any(rule.matches())``
+    loops), but the literal rules are all checked in one pass.
+    """
+
+    def __init__(self, rules: Mapping[str, Sequence[Rule]]):
+        # Every rule gets an ordinal reflecting its (category, position) order;
+        # the winning rule is the matching one with the lowest ordinal.
+        self._entries: List[Tuple[str, Rule]] = []
+        self._regex: List[Tuple[int, Rule]] = []
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[int] = [_NO_MATCH]
+
+        for category, category_rules in rules.items():
+            for rule in category_rules:
+                ordinal = len(self._entries)
+                self._entries.append((category, rule))
+                if rule.is_regex:
+                    self._regex.append((ordinal, rule))
+                else:
+                    self._add_literal(rule.key, ordinal)
+
+        self._build_failure_links()
+
+    def _add_literal(self, pattern: str, ordinal: int) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._out.append(_NO_MATCH)
+                self._goto[state][char] = next_state
+            state = next_state
+        self._out[state] = min(self._out[state], ordinal)
+
+    def _build_failure_links(self) -> None:
+        """Turn the trie into a full automaton (BFS over states)."""
+        fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                fail[next_state] = target if target != next_state else 0
+                # Fold the fallback outputs in, so one lookup per char suffices
+                self._out[next_state] = min(
+                    self._out[next_state], self._out[fail[next_state]]
+                )
+
+        self._fail = fail
+
+    def match(self, domain: str) -> Optional[Tuple[str, Rule]]:
+        """Return ``(category, rule)`` for the first matching rule, or None."""
+        domain = domain.lower()
+        text = label_bounded(domain)
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+
+        best = out[0]
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state] < best:
+                best = out[state]
+
+        # Regex rules only matter if they come before the best literal hit
+        for ordinal, rule in self._regex:
+            if ordinal >= best:
+                break
+            if rule.matches(domain):
+                best = ordinal
+                break
+
+        if best == _NO_MATCH:
+            return None
+        return self._entries[best]
@@ -0,0 +1,306 @@
+"""
+Prometheus-style metrics - counters, gauges and histograms, no dependencies.
+
+Metrics register themselves on creation and :func:`render` produces the
+Prometheus text exposition format served at ``/metrics``.
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Protocol, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Upstream latencies range from sub-millisecond cache work to VIES timeouts
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+_registry: List["_Metric"] = []
+# Sources are summed per name (a module imported under two names registers twice)
+_caches: Dict[str, List["_HasStats"]] = {}
+_flights: Dict[str, List["_HasInFlight"]] = {}
+
+
+class _HasStats(Protocol):
+    stats: Any
+
+
+class _HasInFlight(Protocol):
+    def in_flight(self) -> int: ...
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _labels(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, values: LabelValues, extra: str = "") -> str:
+        pairs = [
+            f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self.samples()
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._labels(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        # Snapshot under the lock: other threads may add label sets meanwhile
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{self._format_labels(key)} {value}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._labels(labels)] = value
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        """Count the wrapped block while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (e.g. latencies in seconds)."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, sum, count)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._labels(labels)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe how long the wrapped block takes."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._labels(labels))
+        return entry[2] if entry else 0
+
+    def samples(self) -> Iterator[str]:
+        # Bucket lists are updated in place: copy them with the dict
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self._values.items()
+            )
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = self._format_labels(key, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            le = self._format_labels(key, 'le="+Inf"')
+            yield f"{self.name}_bucket{le} {count}"
+            yield f"{self.name}_sum{self._format_labels(key)} {total}"
+            yield f"{self.name}_count{self._format_labels(key)} {count}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def error_type(exc: BaseException) -> str:
+    """Bucket an upstream exception as 'fault', 'rate_limit', 'timeout',
+    'connection' or 'other'.
+
+    Matched on class names (and, for rate limits, the message) so this module
+    needs no zeep/httpx/ddgs import.
+    """
+    names = [cls.__name__ for cls in type(exc).__mro__]
+    if "Fault" in names:
+        return "fault"
+    if is_rate_limit(exc):
+        return "rate_limit"
+    if any("Timeout" in name for name in names):
+        return "timeout"
+    if isinstance(exc, (OSError, ConnectionError)) or any(
+        name in ("TransportError", "ConnectError") for name in names
+    ):
+        return "connection"
+    return "other"
+
+
+def is_rate_limit(exc: BaseException) -> bool:
+    """Whether an upstream exception means we are being throttled.
+
+    Covers ddgs' ``RatelimitException``, "202 Ratelimit" errors and HTTP 429s.
+    """
+    text = " ".join(cls.__name__ for cls in type(exc).__mro__) + " " + str(exc)
+    text = text.lower().replace(" ", "").replace("_", "")
+    if "ratelimit" in text or "toomanyrequests" in text:
+        return True
+    return re.search(r"\b429\b", str(exc)) is not None
+
+
+def register_cache(name: str, cache: _HasStats) -> None:
+    """Expose a cache's hit/miss counters (anything with ``.stats``)."""
+    _caches.setdefault(name, []).append(cache)
+
+
+def register_flight(name: str, flight: _HasInFlight) -> None:
+    """Expose the number of keys a single-flight group is fetching."""
+    _flights.setdefault(name, []).append(flight)
+
+
+def render() -> str:
+    """Render every registered metric in Prometheus text format."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+
+    cache_stats = {
+        name: (
+            sum(cache.stats.hits for cache in caches),
+            sum(cache.stats.misses for cache in caches),
+        )
+        for name, caches in sorted(_caches.items())
+    }
+    lines.append("# HELP woosh_cache_hits_total Cache hits")
+    lines.append("# TYPE woosh_cache_hits_total counter")
+    for name, (hits, _) in cache_stats.items():
+        lines.append(f'woosh_cache_hits_total{{cache="{name}"}} {hits}')
+    lines.append("# HELP woosh_cache_misses_total Cache misses")
+    lines.append("# TYPE woosh_cache_misses_total counter")
+    for name, (_, misses) in cache_stats.items():
+        lines.append(f'woosh_cache_misses_total{{cache="{name}"}} {misses}')
+    lines.append("# HELP woosh_cache_hit_ratio Cache hit ratio since start")
+    lines.append("# TYPE woosh_cache_hit_ratio gauge")
+    for name, (hits, misses) in cache_stats.items():
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        lines.append(f'woosh_cache_hit_ratio{{cache="{name}"}} {ratio}')
+
+    lines.append("# HELP woosh_singleflight_keys Distinct keys being fetched")
+    lines.append("# TYPE woosh_singleflight_keys gauge")
+    for name, flights in sorted(_flights.items()):
+        keys = sum(flight.in_flight() for flight in flights)
+        lines.append(f'woosh_singleflight_keys{{flight="{name}"}} {keys}')
+
+    return "\n".join(lines) + "\n"
+
+
+# =============================================================================
+# SHARED METRICS
+# =============================================================================
+
+STAGE_SECONDS = Histogram(
+    "woosh_stage_seconds",
+    "Time spent per processing stage",
+    ["stage"],
+)
+UPSTREAM_ERRORS = Counter(
+    "woosh_upstream_errors_total",
+    "Upstream failures by service and error type",
+    ["service", "type"],
+)
+UPSTREAM_RETRIES = Counter(
+    "woosh_upstream_retries_total",
+    "Upstream calls retried after a transient failure",
+    ["service"],
+)
+CIRCUIT_REJECTIONS = Counter(
+    "woosh_circuit_rejections_total",
+    "Calls failed fast because the upstream's circuit is open",
+    ["service", "key"],
+)
+VAT_LOCAL_REJECTIONS = Counter(
+    "woosh_vat_local_rejections_total",
+    "VAT numbers rejected by the offline format check, without calling VIES",
+    ["country"],
+)
+UPSTREAM_INFLIGHT = Gauge(
+    "woosh_upstream_inflight",
+    "Upstream calls currently in flight",
+    ["service"],
+)
+REQUEST_SECONDS = Histogram(
+    "woosh_http_request_seconds",
+    "HTTP request latency, including the streamed response body",
+    ["method", "route"],
+)
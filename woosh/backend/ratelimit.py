@@ -0,0 +1,170 @@
+"""
+Rate limiting for upstream services (VIES, search backends).
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens/second, bursting up to ``capacity``.
+
+    Callers reserve a token up front and the bucket may go into debt, so each
+    waiter sleeps exactly once for its own slot instead of polling - thousands
+    of queued callers cost one timer each, not a thundering herd.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        # _updated is in the future while the bucket is paused
+        if now > self._updated:
+            elapsed = now - self._updated
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def _delay(self, tokens: float, now: float) -> float:
+        """Wait before a token can be used, once the bucket holds ``tokens``."""
+        paused = max(0.0, self._updated - now)
+        return paused + (0.0 if tokens >= 0 else -tokens / self.rate)
+
+    def _reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Take one token and return how long to wait before using it.
+
+        Returns None, without taking a token, if the wait would exceed
+        ``max_wait`` seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            delay = self._delay(self._tokens - 1, now)
+            if max_wait is not None and delay > max_wait:
+                return None
+            self._tokens -= 1
+            return delay
+
+    def _refund(self) -> None:
+        """Give back a reserved token that was never used."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    def wait_time(self) -> float:
+        """How long a caller arriving now would wait for a token."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return self._delay(self._tokens - 1, now)
+
+    def wait(self, max_wait: Optional[float] = None) -> bool:
+        """Block the calling thread until a token is available.
+
+        Returns:
+            False (without waiting) if that would take longer than ``max_wait``
+        """
+        delay = self._reserve(max_wait)
+        if delay is None:
+            return False
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+    async def acquire(self, max_wait: Optional[float] = None) -> bool:
+        """Wait (as a coroutine) until a token is available.
+
+        Returns:
+            False (without waiting) if that would take longer than ``max_wait``
+        """
+        delay = self._reserve(max_wait)
+        if delay is None:
+            return False
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # Cancelled waiters must not leave the bucket in debt
+                self._refund()
+                raise
+        return True
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """Token bucket that slows down when the upstream pushes back.
+
+    Each throttle (e.g. an HTTP 429 or a "Ratelimit" error) halves the rate,
+    down to ``min_rate``, and pauses every caller for an exponentially growing
+    backoff. Each success adds ``max_rate / 10`` back, so the rate settles
+    just under what the upstream tolerates (AIMD, as in TCP).
+    """
+
+    def __init__(
+        self,
+        max_rate: float,
+        min_rate: Optional[float] = None,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        super().__init__(max_rate)
+        self.max_rate = max_rate
+        self.min_rate = min_rate if min_rate is not None else max_rate / 16
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._throttles = 0
+
+    def on_success(self) -> None:
+        """Record a successful upstream call: creep the rate back up."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._throttles = 0
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    def on_throttle(self) -> float:
+        """Record a rate-limit response: slow down and pause.
+
+        Returns:
+            The backoff pause in seconds
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._updated:
+                # Calls already in flight when we backed off: same episode
+                return self._updated - now
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            pause = min(self.max_backoff, self.backoff * 2**self._throttles)
+            self._throttles += 1
+            # Empty the bucket and only start refilling once the pause is over,
+            # so queued callers resume one by one at the new rate
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = max(self._updated, now + pause)
+            return pause
+
+
+class KeyedRateLimiter:
+    """One :class:`TokenBucket` per key (e.g. per VIES member state)."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, key: str) -> TokenBucket:
+        """Get or create the bucket for ``key``."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets.setdefault(
+                key, TokenBucket(self.rate, self.capacity)
+            )
+        return bucket
+
+    async def acquire(self, key: str) -> None:
+        """Wait until a token is available for ``key``."""
+        await self.bucket(key).acquire()
@@ -0,0 +1,198 @@
+"""
+Rule sets: the classification rules and exclusions, compiled and versioned.
+
+The built-in rules live in ``config.py``; a rule file (JSON, YAML or TOML)
+can replace them at runtime. A rule file looks like::
+
+    version = "2024-06-01"        # optional, defaults to a content hash
+
+    [[rules.finance]]
+    pattern = "bloomberg.com"
+    priority = 10
+
+    [[rules.istituzionali]]
+    pattern = '\\.gov\\.(it|uk)$'
+    is_regex = true
+    priority = 10
+
+    [[excluded]]
+    pattern = "wikipedia.org"
+
+Categories are matched in file order, as in ``config.RULES``. A
+:class:`RuleSet` is immutable once built, so it can be swapped atomically
+while searches are still using the previous one.
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from config import EXCLUDED, RULES, Rule
+from matcher import RuleMatcher
+
+BUILTIN_VERSION = "builtin"
+
+_RULE_KEYS = {"pattern", "is_regex", "priority"}
+
+
+class RulesError(ValueError):
+    """A rule file could not be read or failed validation."""
+
+
+class RuleSet:
+    """Compiled rules and exclusions with a version identifier."""
+
+    def __init__(
+        self,
+        rules: Mapping[str, Sequence[Rule]],
+        excluded: Sequence[Rule],
+        version: str = BUILTIN_VERSION,
+    ):
+        self.rules = {category: list(rules) for category, rules in rules.items()}
+        self.excluded = list(excluded)
+        self.version = version
+        self._matcher = RuleMatcher(self.rules)
+        self._excluded = RuleMatcher({"excluded": self.excluded})
+        self._max_priority = {
+            category: max((rule.priority for rule in rules), default=0)
+            for category, rules in self.rules.items()
+        }
+
+    def match(self, domain: str) -> Optional[Tuple[str, Rule]]:
+        """Return ``(category, rule)`` for the first matching rule, or None."""
+        return self._matcher.match(domain)
+
+    def is_excluded(self, domain: str) -> bool:
+        """Whether results on ``domain`` are dropped altogether."""
+        return self._excluded.match(domain) is not None
+
+    def max_priority(self, category: str) -> int:
+        """Highest priority any rule of ``category`` can assign (0 if none)."""
+        return self._max_priority.get(category, 0)
+
+    def summary(self) -> Dict[str, Any]:
+        """Version and rule counts, for the API."""
+        return {
+            "version": self.version,
+            "categories": {
+                category: len(rules) for category, rules in self.rules.items()
+            },
+            "excluded": len(self.excluded),
+        }
+
+
+def _parse_rule(item: Any, where: str) -> Rule:
+    if not isinstance(item, dict):
+        raise RulesError(f"{where}: expected a table with 'pattern', got {item!r}")
+    unknown = set(item) - _RULE_KEYS
+    if unknown:
+        raise RulesError(f"{where}: unknown keys {sorted(unknown)}")
+
+    pattern = item.get("pattern")
+    if not isinstance(pattern, str) or not pattern:
+        raise RulesError(f"{where}: 'pattern' must be a non-empty string")
+    is_regex = item.get("is_regex", False)
+    if not isinstance(is_regex, bool):
+        raise RulesError(f"{where}: 'is_regex' must be true or false")
+    priority = item.get("priority", 0)
+    if not isinstance(priority, int) or isinstance(priority, bool):
+        raise RulesError(f"{where}: 'priority' must be an integer")
+
+    try:
+        return Rule(pattern, is_regex=is_regex, priority=priority)
+    except re.error as e:
+        raise RulesError(f"{where}: invalid regex {pattern!r}: {e}") from e
+
+
+def _parse_rule_list(items: Any, where: str) -> List[Rule]:
+    if not isinstance(items, list):
+        raise RulesError(f"{where}: expected a list of rules")
+    return [_parse_rule(item, f"{where}[{i}]") for i, item in enumerate(items)]
+
+
+def parse_rules(data: Any, default_version: str) -> RuleSet:
+    """
+    Validate a decoded rule file and compile it.
+
+    Args:
+        data: The decoded document (``rules``, optional ``excluded`` and ``version``)
+        default_version: Version to use when the document doesn't set one
+
+    Returns:
+        The compiled RuleSet
+
+    Raises:
+        RulesError: the document is malformed
+    """
+    if not isinstance(data, dict):
+        raise RulesError("rule file must contain a table/object at the top level")
+    unknown = set(data) - {"version", "rules", "excluded"}
+    if unknown:
+        raise RulesError(f"unknown top-level keys {sorted(unknown)}")
+
+    categories = data.get("rules")
+    if not isinstance(categories, dict) or not categories:
+        raise RulesError("'rules' must map category names to lists of rules")
+    rules = {}
+    for category, items in categories.items():
+        if not isinstance(category, str) or not category:
+            raise RulesError(f"invalid category name {category!r}")
+        rules[category] = _parse_rule_list(items, f"rules.{category}")
+    excluded = _parse_rule_list(data.get("excluded", []), "excluded")
+
+    version = data.get("version", default_version)
+    if not isinstance(version, (str, int, float)) or isinstance(version, bool):
+        raise RulesError("'version' must be a string")
+    return RuleSet(rules, excluded, str(version))
+
+
+def _decode(path: Path, raw: bytes) -> Any:
+    suffix = path.suffix.lower()
+    if suffix == ".json":
+        return json.loads(raw)
+    if suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise RulesError("YAML rule files need PyYAML (pip install pyyaml)") from e
+        return yaml.safe_load(raw)
+    if suffix == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            try:
+                import tomli as tomllib
+            except ImportError as e:
+                raise RulesError("TOML rule files need Python 3.11+ or tomli") from e
+        return tomllib.loads(raw.decode("utf-8"))
+    raise RulesError(f"unsupported rule file type '{suffix}' (json, yaml or toml)")
+
+
+def load_rules(path: str) -> RuleSet:
+    """
+    Read, validate and compile a rule file.
+
+    The version is the file's ``version`` key, or a hash of its content.
+
+    Raises:
+        RulesError: the file is missing, unreadable or invalid
+    """
+    file = Path(path)
+    try:
+        raw = file.read_bytes()
+    except OSError as e:
+        raise RulesError(f"cannot read rule file {path}: {e}") from e
+    try:
+        data = _decode(file, raw)
+    except RulesError:
+        raise
+    except Exception as e:
+        raise RulesError(f"cannot parse rule file {path}: {e}") from e
+    return parse_rules(data, hashlib.sha256(raw).hexdigest()[:12])
+
+
+def builtin_rules() -> RuleSet:
+    """The rules defined in ``config.py``."""
+    return RuleSet(RULES, EXCLUDED, BUILTIN_VERSION)
@@ -28,103 +28,787 @@ URL searching and categorization using DuckDuckGo.
                       ( )( ))( ( ( ) )( ) (( )
 """
 
+import asyncio
 import logging
-from collections import defaultdict
-from functools import lru_cache
-from typing import Dict, List
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 from urllib.parse import urlparse
 
-from classify import classify_url
-from config import EXCLUDED, RULES
-from ddgs import DDGS
+from backends import SearchBackend, create_search_backend
+from cache import create_cache
+from classify import active_rules, lookup_domain, max_priority
+from config import (
+    SEARCH_BACKENDS,
+    SEARCH_BACKOFF,
+    SEARCH_BACKOFF_MAX,
+    SEARCH_BATCH_CONCURRENCY,
+    SEARCH_BATCH_RATE,
+    SEARCH_CACHE_BACKEND,
+    SEARCH_CACHE_MAX_BYTES,
+    SEARCH_CACHE_PATH,
+    SEARCH_CACHE_TTL,
+    SEARCH_MAX_CONCURRENCY,
+    SEARCH_PAGE_SIZE,
+    SEARCH_QUEUE_MAX_WAIT,
+    SEARCH_RATE,
+    SEARCH_RETRIES,
+)
+from domains import hostname, registrable_domain
+from fastjson import dumps, loads
+from metrics import (
+    STAGE_SECONDS,
+    UPSTREAM_ERRORS,
+    UPSTREAM_INFLIGHT,
+    UPSTREAM_RETRIES,
+    error_type,
+    is_rate_limit,
+    register_cache,
+    register_flight,
+)
+from ratelimit import AdaptiveTokenBucket, TokenBucket
+from rules import RuleSet
+from singleflight import AsyncSingleFlight, SingleFlight
 
 logger = logging.getLogger(__name__)
 
 
+class SearchError(Exception):
+    """A search could not be served; ``retry_after`` hints when to try again."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SearchRateLimitedError(SearchError):
+    """The upstream is throttling us, or the wait for a slot is too long."""
+
+
+class SearchUnavailableError(SearchError):
+    """The search backend failed."""
+
+
+# Configured search backend (DDGS by default), created on first use
+_backend: Optional[SearchBackend] = None
+
+# Backends are blocking clients: async searches run them on this dedicated pool,
+# sized to the upstream concurrency limit so it can never be oversubscribed.
+_search_executor = ThreadPoolExecutor(
+    max_workers=SEARCH_MAX_CONCURRENCY, thread_name_prefix="woosh-search"
+)
+_search_loop: Optional[asyncio.AbstractEventLoop] = None
+_search_semaphore: Optional[asyncio.Semaphore] = None
+
+# Ranked results keyed on the normalized query and ranking parameters
+_search_cache = create_cache(
+    SEARCH_CACHE_BACKEND,
+    table="search",
+    max_bytes=SEARCH_CACHE_MAX_BYTES,
+    path=SEARCH_CACHE_PATH,
+)
+
+# Paces every backend call, slowing down when the upstream rate-limits us
+_upstream_limiter = AdaptiveTokenBucket(
+    SEARCH_RATE, backoff=SEARCH_BACKOFF, max_backoff=SEARCH_BACKOFF_MAX
+)
+
+# Set by _on_throttle when a federated call answered but was partly throttled
+_fetch_state = threading.local()
+
+# Concurrent identical searches share one upstream request
+_search_flight = SingleFlight()
+_async_search_flight = AsyncSingleFlight()
+
+register_cache("search", _search_cache)
+register_flight("search", _search_flight)
+register_flight("search_async", _async_search_flight)
+
+
 def _get_base_domain(domain: str) -> str:
-    """Extract base domain, removing subdomains like www, m, mobile."""
-    parts = domain.split(".")
-    if len(parts) > 2 and parts[0] in ("www", "m", "mobile", "en", "it"):
-        return ".".join(parts[1:])
-    return domain
+    """Registrable domain of a netloc ('shop.example.co.uk' -> 'example.co.uk')."""
+    return registrable_domain(hostname(domain))
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query: case-folded with whitespace collapsed."""
+    return " ".join(query.casefold().split())
+
+
+def _search_cache_key(
+    query: str,
+    max_results: int,
+    top_per_category: int,
+    categories: Optional[Sequence[str]] = None,
+    version: Optional[str] = None,
+) -> str:
+    scope = ",".join(sorted(set(categories))) if categories else "*"
+    # Results ranked under other rules are not served once the rules change
+    if version is None:
+        version = active_rules().version
+    # "r:" marks entries holding a whole response body (see _encode_entry)
+    return (
+        f"r:{version}:{max_results}:{top_per_category}:{scope}:{normalize_query(query)}"
+    )
+
+
+def _encode_entry(ranked_results: Dict[str, List[str]], rules_version: str) -> bytes:
+    """A search cache entry: the /api/search response body, already encoded."""
+    total = sum(len(urls) for urls in ranked_results.values())
+    return dumps(
+        {"results": ranked_results, "total": total, "rules_version": rules_version}
+    )
+
+
+def _decode_entry(entry: bytes) -> Dict[str, List[str]]:
+    return loads(entry)["results"]
+
+
+def search_cache_stats() -> Dict[str, float]:
+    """Hit/miss counters of the search result cache."""
+    return {
+        **_search_cache.stats.as_dict(),
+        "entries": len(_search_cache.memory),
+        "bytes": _search_cache.memory.size_bytes,
+    }
+
+
+def merge_results(
+    *result_sets: Dict[str, List[str]], top_per_category: int = 5
+) -> Dict[str, List[str]]:
+    """Merge ranked result sets, earlier sets first, deduplicated by base domain."""
+    merged: Dict[str, List[str]] = {}
+    seen_domains: set[str] = set()
+    for results in result_sets:
+        for category, urls in results.items():
+            kept = merged.setdefault(category, [])
+            for url in urls:
+                base_domain = _get_base_domain(urlparse(url).netloc.lower())
+                if len(kept) >= top_per_category or base_domain in seen_domains:
+                    continue
+                seen_domains.add(base_domain)
+                kept.append(url)
+    return {category: urls for category, urls in merged.items() if urls}
+
+
+def _get_backend() -> SearchBackend:
+    """Get or create the configured search backend."""
+    global _backend
+    if _backend is None:
+        _backend = create_search_backend(SEARCH_BACKENDS, on_throttle=_on_throttle)
+    return _backend
+
+
+def _on_throttle(backend: SearchBackend, error: Exception) -> None:
+    """A federated backend was throttled while others answered: slow down."""
+    _fetch_state.throttled = True
+    UPSTREAM_ERRORS.inc(service="search", type="rate_limit")
+    pause = _upstream_limiter.on_throttle()
+    logger.warning(
+        f"Search backend {backend.name} rate limited us, pausing {pause:.1f}s"
+    )
+
+
+def _fetch_page(
+    backend: SearchBackend, query: str, max_results: int, timeout: int, page: int = 1
+) -> List[Dict[str, Any]]:
+    """One paced, timed backend call, retried with backoff when throttled.
+
+    Raises:
+        SearchRateLimitedError: the upstream kept throttling us, or waiting
+            for a slot would take longer than ``SEARCH_QUEUE_MAX_WAIT``
+    """
+    attempt = 0
+    while True:
+        if not _upstream_limiter.wait(SEARCH_QUEUE_MAX_WAIT):
+            retry_after = _upstream_limiter.wait_time()
+            raise SearchRateLimitedError(
+                f"Search is busy, retry in {retry_after:.0f}s", retry_after
+            )
+        _fetch_state.throttled = False
+        try:
+            with STAGE_SECONDS.time(
+                stage="search_fetch"
+            ), UPSTREAM_INFLIGHT.track_inprogress(service="search"):
+                batch = backend.search(query, max_results, timeout, page)
+        except Exception as e:
+            if not is_rate_limit(e):
+                raise
+            pause = _upstream_limiter.on_throttle()
+            logger.warning(f"Search upstream rate limited us, pausing {pause:.1f}s")
+            if attempt >= SEARCH_RETRIES:
+                raise SearchRateLimitedError(
+                    f"Search upstream is rate limiting: {str(e)}", pause
+                ) from e
+            # The next wait() sleeps out the pause, or gives up past the max wait
+            UPSTREAM_RETRIES.inc(service="search")
+            attempt += 1
+            continue
+        if not _fetch_state.throttled:
+            _upstream_limiter.on_success()
+        return batch
+
+
+# Errors on a later page that must not be mistaken for the end of the results
+_PAGING_FAILURES = ("timeout", "connection")
+
+
+def _iter_upstream(
+    query: str, max_results: int, timeout: int, page_size: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yield raw results from the configured search backend.
+
+    With ``page_size`` the results are fetched one page at a time, so callers
+    can act on the first page while later ones are still upstream.
+    """
+    with closing(_iter_upstream_pages(query, max_results, timeout, page_size)) as pages:
+        for batch in pages:
+            yield from batch
+
+
+def _iter_upstream_pages(
+    query: str, max_results: int, timeout: int, page_size: Optional[int] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """Like :func:`_iter_upstream`, yielding each fetched page as a list."""
+    backend = _get_backend()
+    if page_size is None:
+        try:
+            batch = _fetch_page(backend, query, max_results, timeout)
+        except Exception as e:
+            UPSTREAM_ERRORS.inc(service="search", type=error_type(e))
+            raise
+        yield batch
+        return
+
+    fetched = 0
+    page = 1
+    while fetched < max_results:
+        try:
+            # Every page is requested at the same size, so backends can locate
+            # page N; the last one is truncated here
+            batch = _fetch_page(backend, query, page_size, timeout, page)
+        except Exception as e:
+            kind = error_type(e)
+            # Backends raise once they run out of pages; a timeout or a
+            # dropped connection means the results are incomplete
+            if page == 1 or isinstance(e, SearchError) or kind in _PAGING_FAILURES:
+                UPSTREAM_ERRORS.inc(service="search", type=kind)
+                raise
+            logger.debug(f"Stopped paging '{query}' at page {page}: {e}")
+            return
+        if not batch:
+            return
+        batch = batch[: max_results - fetched]
+        fetched += len(batch)
+        page += 1
+        yield batch
+
+
+def _iter_classified(
+    search_results: Iterable[Dict[str, Any]],
+    rules: RuleSet,
+    seen_domains: Optional[set[str]] = None,
+) -> Iterator[Tuple[str, str, int]]:
+    """Skip excluded and duplicate domains, yielding (category, url, priority).
+
+    Pass the same ``seen_domains`` to dedup across several calls (pages).
+    """
+    if seen_domains is None:
+        seen_domains = set()
+    # Time spent classifying, excluding waits on the upstream between results
+    elapsed = 0.0
+    try:
+        for result in search_results:
+            start = time.perf_counter()
+            entry = _classify_result(result, seen_domains, rules)
+            elapsed += time.perf_counter() - start
+            if entry is not None:
+                yield entry
+    finally:
+        STAGE_SECONDS.observe(elapsed, stage="search_classify")
+
+
+def _classify_result(
+    result: Dict[str, Any], seen_domains: set[str], rules: RuleSet
+) -> Optional[Tuple[str, str, int]]:
+    """Classify one raw result, or return None if it is skipped."""
+    url = result.get("href", "")
+    if not url:
+        return None
+
+    try:
+        parsed_url = urlparse(url)
+        domain = parsed_url.netloc.lower()
+
+        # Skip excluded domains (memoized with the classification)
+        excluded, classification = lookup_domain(domain, rules)
+        if excluded:
+            return None
+
+        # Deduplicate by base domain
+        base_domain = _get_base_domain(domain)
+        if base_domain in seen_domains:
+            return None
+        seen_domains.add(base_domain)
+
+    except Exception as e:
+        logger.debug(f"Error processing URL {url}: {e}")
+        return None
+
+    return classification.category, url, classification.priority
+
+
+def _rank(
+    classified: Iterable[Tuple[str, str, int]], top_per_category: int
+) -> Dict[str, List[str]]:
+    """Sort by priority and limit per category."""
+    results: Dict[str, List[tuple[str, int]]] = defaultdict(list)
+    for category, url, priority in classified:
+        results[category].append((url, priority))
+
+    ranked_results = {}
+    for category, urls in results.items():
+        sorted_urls = sorted(urls, key=lambda x: x[1], reverse=True)
+        ranked_results[category] = [url for url, _ in sorted_urls[:top_per_category]]
+    return ranked_results
+
 
+def _run_search(
+    query: str,
+    max_results: int,
+    timeout: int,
+    top_per_category: int,
+    categories: Optional[Sequence[str]] = None,
+    time_budget: Optional[float] = None,
+) -> Tuple[Dict[str, List[str]], bool]:
+    """Fetch, classify and rank results. Upstream failures propagate.
 
-def _get_priority(url: str, category: str) -> int:
-    """Get priority score for a URL based on its category rules."""
-    domain = urlparse(url).netloc.lower()
-    if category in RULES:
-        for rule in RULES[category]:
-            if rule.matches(domain):
-                return rule.priority
-    return 0
+    Returns:
+        Tuple of (ranked results, complete), where complete is False when the
+        time budget cut the search short
+    """
+    wanted = set(categories) if categories else None
+    deadline = time.monotonic() + time_budget if time_budget else None
+    if deadline is not None:
+        # A page in flight can't be interrupted: don't let it outlive the budget
+        timeout = max(1, min(timeout, int(time_budget)))
+    # Fetch page by page only when we may stop early
+    page_size = SEARCH_PAGE_SIZE if wanted or deadline else None
+
+    classified: List[Tuple[str, str, int]] = []
+    top_hits: Counter = Counter()
+    complete = True
+    # One rule set for the whole search, even if the rules are reloaded meanwhile
+    rules = active_rules()
+
+    with closing(_iter_upstream(query, max_results, timeout, page_size)) as upstream:
+        for category, url, priority in _iter_classified(upstream, rules):
+            if wanted is None or category in wanted:
+                classified.append((category, url, priority))
+                if wanted and priority >= max_priority(category, rules):
+                    top_hits[category] += 1
+                    # Later results can't outrank top_per_category max-priority
+                    # hits already kept, so the answer is final
+                    if all(top_hits[c] >= top_per_category for c in wanted):
+                        logger.info(f"Categories saturated for '{query}', stopping")
+                        break
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.info(f"Time budget spent for '{query}', stopping")
+                complete = False
+                break
+
+    ranked_results = _rank(classified, top_per_category)
+
+    total = sum(len(urls) for urls in ranked_results.values())
+    logger.info(f"Found {total} results across {len(ranked_results)} categories")
+    return ranked_results, complete
 
 
-@lru_cache(maxsize=128)
 def search_companies(
-    query: str, max_results: int = 100, timeout: int = 10, top_per_category: int = 5
+    query: str,
+    max_results: int = 100,
+    timeout: int = 10,
+    top_per_category: int = 5,
+    categories: Optional[Sequence[str]] = None,
+    time_budget: Optional[float] = None,
 ) -> Dict[str, List[str]]:
     """Search for companies and categorize the results by domain type.
 
+    Results are cached for ``SEARCH_CACHE_TTL`` seconds under the normalized
+    query and the active rules version, so 'Coca Cola' and 'coca cola '
+    share an entry and a rule change is reflected straight away. Failed searches
+    are never cached. Concurrent calls for the same key share one upstream
+    request.
+
+    Upstream calls are paced by an adaptive rate limiter that slows down and
+    backs off when the backend rate-limits us.
+
+    Passing ``categories`` and/or ``time_budget`` enables early termination:
+    upstream results are consumed page by page and fetching stops as soon as
+    every requested category holds ``top_per_category`` max-priority results
+    (the ranking can no longer change), or when the budget is spent (partial
+    results, not cached).
+
     Args:
         query: Search query string
         max_results: Maximum number of results to process
         timeout: Timeout in seconds for the search
         top_per_category: Maximum results to return per category (ranked by priority)
+        categories: Only return these categories, and stop once they are saturated
+        time_budget: Stop consuming upstream results after this many seconds
 
     Returns:
         Dictionary mapping categories to lists of URLs (sorted by priority)
+
+    Raises:
+        SearchRateLimitedError: the backend is throttling us or the queue for
+            an upstream slot is too long (``retry_after`` says when to retry)
+        SearchUnavailableError: the backend failed
     """
+    return _decode_entry(
+        _search_entry(
+            _search_cache.get,
+            query,
+            max_results,
+            timeout,
+            top_per_category,
+            categories,
+            time_budget,
+        )
+    )
+
+
+def _search_entry(
+    lookup: Callable[[str], Optional[bytes]],
+    query: str,
+    max_results: int,
+    timeout: int,
+    top_per_category: int,
+    categories: Optional[Sequence[str]],
+    time_budget: Optional[float],
+) -> bytes:
+    """Encoded response for a search, from the cache (via ``lookup``) or upstream."""
+    version = active_rules().version
     if not query or not query.strip():
         logger.warning("Empty query provided")
-        return {}
+        return _encode_entry({}, version)
 
-    results: Dict[str, List[tuple[str, int]]] = defaultdict(list)
-    seen_domains: set[str] = set()
+    key = _search_cache_key(query, max_results, top_per_category, categories, version)
+    cached = lookup(key)
+    if cached is not None:
+        return cached
 
     try:
-        with DDGS(timeout=timeout) as search:
-            search_results = search.text(query, max_results=max_results)
+        return _search_flight.do(
+            (key, time_budget),
+            _search_and_cache,
+            key,
+            version,
+            query,
+            max_results,
+            timeout,
+            top_per_category,
+            categories,
+            time_budget,
+        )
+    except SearchError as e:
+        logger.warning(f"Search refused for query '{query}': {e}")
+        raise
+    except Exception as e:
+        logger.error(f"Search failed for query '{query}': {e}")
+        raise SearchUnavailableError(f"Search failed: {str(e)}") from e
 
-            for result in search_results:
-                url = result.get("href", "")
-                if not url:
-                    continue
 
-                try:
-                    parsed_url = urlparse(url)
-                    domain = parsed_url.netloc.lower()
+def _search_and_cache(
+    key: str,
+    version: str,
+    query: str,
+    max_results: int,
+    timeout: int,
+    top_per_category: int,
+    categories: Optional[Sequence[str]],
+    time_budget: Optional[float],
+) -> bytes:
+    ranked_results, complete = _run_search(
+        query, max_results, timeout, top_per_category, categories, time_budget
+    )
+    entry = _encode_entry(ranked_results, version)
+    if complete:
+        _search_cache.set(key, entry, SEARCH_CACHE_TTL)
+    return entry
 
-                    # Skip excluded domains
-                    if any(excluded.matches(domain) for excluded in EXCLUDED):
-                        continue
 
-                    # Deduplicate by base domain
-                    base_domain = _get_base_domain(domain)
-                    if base_domain in seen_domains:
-                        continue
-                    seen_domains.add(base_domain)
+def _get_search_semaphore() -> asyncio.Semaphore:
+    """Get the upstream concurrency semaphore for the running event loop."""
+    global _search_loop, _search_semaphore
+    loop = asyncio.get_running_loop()
+    if _search_semaphore is None or _search_loop is not loop:
+        _search_loop = loop
+        _search_semaphore = asyncio.Semaphore(SEARCH_MAX_CONCURRENCY)
+    return _search_semaphore
 
-                    # Classify and score
-                    category = classify_url(url)
-                    priority = _get_priority(url, category)
-                    results[category].append((url, priority))
 
-                except Exception as e:
-                    logger.debug(f"Error processing URL {url}: {e}")
-                    continue
+async def search_companies_async(
+    query: str,
+    max_results: int = 100,
+    timeout: int = 10,
+    top_per_category: int = 5,
+    categories: Optional[Sequence[str]] = None,
+    time_budget: Optional[float] = None,
+) -> Dict[str, List[str]]:
+    """Async variant of :func:`search_companies` with bounded upstream concurrency.
 
-        # Sort by priority and limit per category
-        ranked_results = {}
-        for category, urls in results.items():
-            sorted_urls = sorted(urls, key=lambda x: x[1], reverse=True)
-            ranked_results[category] = [
-                url for url, _ in sorted_urls[:top_per_category]
-            ]
+    At most ``SEARCH_MAX_CONCURRENCY`` searches talk to the backend at once;
+    everything else waits on a semaphore as a plain coroutine, so in-flight
+    requests don't pin threads and cancelled callers never reach the upstream.
+    Identical concurrent searches are coalesced before taking a slot.
+    """
+    return _decode_entry(
+        await search_response_async(
+            query, max_results, timeout, top_per_category, categories, time_budget
+        )
+    )
+
+
+async def search_response_async(
+    query: str,
+    max_results: int = 100,
+    timeout: int = 10,
+    top_per_category: int = 5,
+    categories: Optional[Sequence[str]] = None,
+    time_budget: Optional[float] = None,
+) -> bytes:
+    """Like :func:`search_companies_async`, returning the encoded /api/search body.
+
+    Cache hits are answered with the stored bytes, without decoding,
+    validating or re-encoding anything. Memory hits never leave the event
+    loop; a lookup in the SQLite store (which may wait on another worker's
+    write lock) runs on the search pool.
+
+    Returns:
+        JSON object with ``results``, ``total`` and ``rules_version``
+    """
+    version = active_rules().version
+    key = _search_cache_key(query, max_results, top_per_category, categories, version)
+    cached = await _search_cache.get_async(key, _search_executor)
+    if cached is not None:
+        return cached
+    return await _async_search_flight.do(
+        (key, time_budget),
+        _search_in_executor,
+        query,
+        max_results,
+        timeout,
+        top_per_category,
+        categories,
+        time_budget,
+    )
+
+
+async def _search_in_executor(
+    query: str,
+    max_results: int,
+    timeout: int,
+    top_per_category: int,
+    categories: Optional[Sequence[str]],
+    time_budget: Optional[float],
+) -> bytes:
+    loop = asyncio.get_running_loop()
+    async with _get_search_semaphore():
+        # The miss was counted on the loop: recheck without counting another
+        return await loop.run_in_executor(
+            _search_executor,
+            _search_entry,
+            _search_cache.peek,
+            query,
+            max_results,
+            timeout,
+            top_per_category,
+            categories,
+            time_budget,
+        )
+
+
+def _ranked_event(ranked_results: Dict[str, List[str]]) -> Dict[str, Any]:
+    return {
+        "event": "ranked",
+        "results": ranked_results,
+        "total": sum(len(urls) for urls in ranked_results.values()),
+    }
+
+
+def iter_search_events(
+    query: str, max_results: int = 100, timeout: int = 10, top_per_category: int = 5
+) -> Iterator[Dict[str, Any]]:
+    """Search like :func:`search_companies`, yielding results as they arrive.
+
+    Upstream results are fetched page by page (``SEARCH_PAGE_SIZE``) and each
+    kept result is emitted as a ``result`` event straight away. The stream
+    always ends with a ``ranked`` event holding the same snapshot
+    :func:`search_companies` would return, preceded by an ``error`` event if
+    the upstream failed part-way (with ``retry_after`` when rate limited). A
+    cache hit yields only the ``ranked`` event.
 
-        total = sum(len(urls) for urls in ranked_results.values())
-        logger.info(f"Found {total} results across {len(ranked_results)} categories")
-        return ranked_results
+    Args:
+        query: Search query string
+        max_results: Maximum number of results to process
+        timeout: Timeout in seconds for each upstream page
+        top_per_category: Maximum results per category in the final snapshot
 
+    Yields:
+        Event dictionaries with an ``event`` key: 'result', 'error' or 'ranked'
+    """
+    with closing(
+        _iter_event_pages(query, max_results, timeout, top_per_category)
+    ) as pages:
+        for events in pages:
+            yield from events
+
+
+def _iter_event_pages(
+    query: str, max_results: int, timeout: int, top_per_category: int
+) -> Iterator[List[Dict[str, Any]]]:
+    """The events of :func:`iter_search_events`, one list per upstream page."""
+    if not query or not query.strip():
+        logger.warning("Empty query provided")
+        yield [_ranked_event({})]
+        return
+
+    version = active_rules().version
+    key = _search_cache_key(query, max_results, top_per_category, version=version)
+    cached = _search_cache.get(key)
+    if cached is not None:
+        yield [_ranked_event(_decode_entry(cached))]
+        return
+
+    rules = active_rules()
+    seen_domains: set[str] = set()
+    classified: List[Tuple[str, str, int]] = []
+    final: List[Dict[str, Any]] = []
+    try:
+        for page in _iter_upstream_pages(query, max_results, timeout, SEARCH_PAGE_SIZE):
+            events = []
+            for category, url, priority in _iter_classified(page, rules, seen_domains):
+                classified.append((category, url, priority))
+                events.append(
+                    {
+                        "event": "result",
+                        "category": category,
+                        "url": url,
+                        "priority": priority,
+                    }
+                )
+            yield events
+    except SearchRateLimitedError as e:
+        logger.warning(f"Search refused for query '{query}': {e}")
+        final.append({"event": "error", "detail": str(e), "retry_after": e.retry_after})
     except Exception as e:
         logger.error(f"Search failed for query '{query}': {e}")
-        return {}
+        final.append({"event": "error", "detail": f"Search failed: {str(e)}"})
+
+    ranked_results = _rank(classified, top_per_category)
+    if not final:
+        _search_cache.set(key, _encode_entry(ranked_results, version), SEARCH_CACHE_TTL)
+    final.append(_ranked_event(ranked_results))
+    yield final
+
+
+async def iter_search_events_async(
+    query: str, max_results: int = 100, timeout: int = 10, top_per_category: int = 5
+) -> AsyncIterator[Dict[str, Any]]:
+    """Async variant of :func:`iter_search_events`.
+
+    Each upstream page is fetched on the search pool while holding one
+    upstream concurrency slot; the slot is released before the page's events
+    are handed to the consumer, so slow readers don't hold back other searches.
+    """
+    loop = asyncio.get_running_loop()
+    pages = _iter_event_pages(query, max_results, timeout, top_per_category)
+    done = object()
+    try:
+        while True:
+            async with _get_search_semaphore():
+                events = await loop.run_in_executor(_search_executor, next, pages, done)
+            if events is done:
+                break
+            for event in events:
+                yield event
+    finally:
+        try:
+            pages.close()
+        except ValueError:
+            # Still running in the pool (consumer went away mid-page)
+            pass
+
+
+# Upstream budget shared by all batch searches
+_batch_limiter = TokenBucket(SEARCH_BATCH_RATE)
+
+
+async def search_companies_batch(
+    queries: Iterable[str],
+    max_results: int = 100,
+    top_per_category: int = 5,
+    concurrency: int = SEARCH_BATCH_CONCURRENCY,
+) -> AsyncIterator[Tuple[str, Dict[str, List[str]], Optional[SearchError]]]:
+    """Run many searches, yielding ``(query, results, error)`` as each completes.
+
+    Queries are deduplicated by their normalized form (the first spelling
+    is reported) and go through :func:`search_companies_async`, so ranking
+    and caching match single searches. Cache misses are throttled by a
+    token bucket shared by all batches; cache hits skip it. A failed search
+    yields empty results and its :class:`SearchError` without stopping the
+    batch.
+
+    Args:
+        queries: Company names to search for
+        max_results: Maximum number of results to process per query
+        top_per_category: Maximum results to return per category (ranked by priority)
+        concurrency: Maximum searches in flight for this batch
+
+    Yields:
+        Tuples of (query, categorized results, error or None), in completion
+        order
+    """
+    unique: Dict[str, str] = {}
+    for query in queries:
+        if query.strip():
+            unique.setdefault(normalize_query(query), query)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(
+        query: str,
+    ) -> Tuple[str, Dict[str, List[str]], Optional[SearchError]]:
+        async with semaphore:
+            key = _search_cache_key(query, max_results, top_per_category)
+            if await _search_cache.peek_async(key, _search_executor) is None:
+                await _batch_limiter.acquire()
+            try:
+                results = await search_companies_async(
+                    query, max_results, top_per_category=top_per_category
+                )
+            except SearchError as e:
+                return query, {}, e
+            return query, results, None
+
+    tasks = [asyncio.ensure_future(run(query)) for query in unique.values()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
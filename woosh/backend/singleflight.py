@@ -0,0 +1,78 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one upstream call and all
+receive its result (or its exception), instead of each missing the cache and
+hitting DDGS / VIES on their own.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent calls from threads (sync code paths)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, "Future[Any]"] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` unless a call for ``key`` is already in flight."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently being fetched."""
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """Coalesce concurrent calls from coroutines on the event loop."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[T]], *args: Any) -> T:
+        """Await ``fn(*args)`` unless a call for ``key`` is already in flight."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # One caller going away must not cancel the call shared with the rest
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: "asyncio.Future[Any]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently being fetched."""
+        return len(self._calls)
@@ -1 +1,34 @@
 """Pytest configuration for backend tests."""
+
+import classify
+import pytest
+import search
+import vies
+from ratelimit import AdaptiveTokenBucket
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with empty result caches and closed VIES circuits."""
+    classify._domain_memo.clear()
+    search._search_cache.clear()
+    vies._vat_cache.clear()
+    vies._country_breakers.clear()
+    yield
+    search._search_cache.clear()
+    vies._vat_cache.clear()
+    vies._country_breakers.clear()
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    """Retry transient VIES faults immediately."""
+    monkeypatch.setattr(vies, "VIES_RETRY_BACKOFF", 0)
+
+
+@pytest.fixture(autouse=True)
+def fast_search_limiter(monkeypatch):
+    """Don't pace or pause test searches (each test gets a fresh limiter)."""
+    monkeypatch.setattr(
+        search, "_upstream_limiter", AdaptiveTokenBucket(1e6, backoff=0)
+    )
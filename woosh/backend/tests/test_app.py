@@ -0,0 +1,311 @@
+"""Tests for the FastAPI endpoints."""
+
+import json
+import time
+
+import domains
+import pytest
+import vies
+from app import app, preload
+from fastapi.testclient import TestClient
+from search import search_cache_stats
+from test_search import (
+    BrokenDDGS,
+    CountingDDGS,
+    FailingDDGS,
+    MockDDGS,
+    PagedMockDDGS,
+)
+from test_vies import FakeAsyncService, _fake_async_client
+
+
+@pytest.fixture
+def vies_service(monkeypatch):
+    service = FakeAsyncService()
+    monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+    return service
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+class TestVatBatch:
+    """Tests for POST /api/vat/batch."""
+
+    def test_json_list_is_deduplicated(self, client, vies_service):
+        response = client.post(
+            "/api/vat/batch",
+            json=["IT12345678903", "it 12345678903", "12345678903", "DE123456788"],
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = _ndjson(response)
+        assert sorted((r["country_code"], r["vat_number"]) for r in rows) == [
+            ("DE", "123456788"),
+            ("IT", "12345678903"),
+        ]
+        assert sorted(vies_service.calls) == [
+            ("DE", "123456788"),
+            ("IT", "12345678903"),
+        ]
+
+    def test_csv_upload_skips_header(self, client, vies_service):
+        response = client.post(
+            "/api/vat/batch?country=FR",
+            content="vat_number,name\n32123456789,Acme\nIT98765432103,Foo\n",
+            headers={"content-type": "text/csv"},
+        )
+
+        rows = _ndjson(response)
+        assert sorted((r["country_code"], r["vat_number"]) for r in rows) == [
+            ("FR", "32123456789"),
+            ("IT", "98765432103"),
+        ]
+
+    def test_ndjson_upload(self, client, vies_service):
+        response = client.post(
+            "/api/vat/batch",
+            content='"IT12345678903"\n{"vat_number": "DE123456788"}\n',
+            headers={"content-type": "application/x-ndjson"},
+        )
+
+        assert len(_ndjson(response)) == 2
+
+    def test_per_item_errors_do_not_fail_batch(self, client, monkeypatch):
+        service = FakeAsyncService(fault=True)
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+
+        response = client.post(
+            "/api/vat/batch", json=["IT12345678903", "IT12345678911"]
+        )
+
+        assert response.status_code == 200
+        rows = _ndjson(response)
+        assert len(rows) == 2
+        assert all(not r["is_valid"] and r["error_message"] for r in rows)
+
+    def test_malformed_numbers_skip_vies(self, client, vies_service):
+        response = client.post(
+            "/api/vat/batch", json=["IT12345678903", "IT12345678901", "IT1"]
+        )
+
+        rows = _ndjson(response)
+        assert len(rows) == 3
+        assert vies_service.calls == [("IT", "12345678903")]
+        rejected = [r for r in rows if r["error_message"]]
+        assert sorted(r["error_message"] for r in rejected) == [
+            "Invalid VAT number: check digit mismatch",
+            "Invalid VAT number: wrong length or format",
+        ]
+
+    def test_invalid_body(self, client, vies_service):
+        response = client.post("/api/vat/batch", json={"vat": "IT1"})
+        assert response.status_code == 400
+
+
+class TestSearchStream:
+    """Tests for GET /api/search/stream."""
+
+    def test_ndjson_stream(self, client, monkeypatch):
+        monkeypatch.setattr("backends.DDGS", PagedMockDDGS)
+
+        response = client.get("/api/search/stream", params={"query": "Acme"})
+
+        events = _ndjson(response)
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert events[0]["event"] == "result"
+        assert events[-1]["event"] == "ranked"
+        assert events[-1]["total"] == 4
+
+    def test_sse_stream(self, client, monkeypatch):
+        monkeypatch.setattr("backends.DDGS", PagedMockDDGS)
+
+        response = client.get(
+            "/api/search/stream", params={"query": "Acme", "format": "sse"}
+        )
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text.startswith("event: result\ndata: {")
+        assert "event: ranked\n" in response.text
+
+
+class TestSearchBatch:
+    """Tests for POST /api/search/batch."""
+
+    def test_streams_one_row_per_distinct_query(self, client, monkeypatch):
+        monkeypatch.setattr("backends.DDGS", MockDDGS)
+
+        response = client.post(
+            "/api/search/batch",
+            json={"queries": ["Acme", "acme ", "Globex"], "max_results": 10},
+        )
+
+        rows = {row["query"]: row for row in _ndjson(response)}
+        assert sorted(rows) == ["Acme", "Globex"]
+        assert rows["Acme"]["total"] == 4
+        assert rows["Acme"]["results"]["social"] == [
+            "https://www.linkedin.com/company/acme"
+        ]
+
+    def test_rejects_oversized_batch(self, client, monkeypatch):
+        monkeypatch.setattr("app.SEARCH_BATCH_MAX_ITEMS", 1)
+
+        response = client.post("/api/search/batch", json={"queries": ["a", "b"]})
+
+        assert response.status_code == 413
+
+
+class TestCompanyProfile:
+    """Tests for GET /api/company/{vat_number}."""
+
+    def test_merges_vat_and_name_searches(self, client, vies_service, monkeypatch):
+        monkeypatch.setattr("backends.DDGS", MockDDGS)
+
+        response = client.get("/api/company/IT12345678903", params={"max_results": 10})
+
+        body = response.json()
+        assert body["vat"]["company_name"] == "ACME SRL"
+        # Name results win; VAT-number hits on the same domains are dropped
+        assert body["results"]["social"] == [
+            "https://www.linkedin.com/company/acme-srl"
+        ]
+        assert body["total"] == 4
+
+    def test_undisclosed_name_uses_vat_search_only(self, client, monkeypatch):
+        service = FakeAsyncService()
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+        monkeypatch.setattr("backends.DDGS", MockDDGS)
+
+        async def undisclosed(countryCode, vatNumber):
+            info = await FakeAsyncService.checkVat(service, countryCode, vatNumber)
+            info.name = "---"
+            return info
+
+        monkeypatch.setattr(service, "checkVat", undisclosed)
+
+        response = client.get("/api/company/DE123456788", params={"max_results": 10})
+
+        assert response.json()["results"]["social"] == [
+            "https://www.linkedin.com/company/de123456788"
+        ]
+
+    def test_malformed_number_skips_searches(self, client, vies_service, monkeypatch):
+        CountingDDGS.calls = 0
+        monkeypatch.setattr("backends.DDGS", CountingDDGS)
+
+        response = client.get("/api/company/IT12345678901")
+
+        body = response.json()
+        assert body["vat"]["is_valid"] is False
+        assert body["results"] == {} and body["total"] == 0
+        assert CountingDDGS.calls == 0
+        assert vies_service.calls == []
+
+    def test_failed_vat_search_keeps_name_results(
+        self, client, vies_service, monkeypatch
+    ):
+        class VATSearchFails(MockDDGS):
+            def text(self, query, max_results=10):
+                if query.startswith("IT"):
+                    raise RuntimeError("connection reset")
+                return super().text(query, max_results)
+
+        monkeypatch.setattr("backends.DDGS", VATSearchFails)
+
+        response = client.get("/api/company/IT12345678903", params={"max_results": 10})
+
+        assert response.status_code == 200
+        assert response.json()["results"]["social"] == [
+            "https://www.linkedin.com/company/acme-srl"
+        ]
+
+
+class TestReadiness:
+    """Tests for GET /api/ready."""
+
+    def test_not_ready_until_vies_client_is_warm(self, client, monkeypatch):
+        monkeypatch.setattr(vies, "_async_vies_client", None)
+
+        assert client.get("/api/ready").status_code == 503
+
+    def test_startup_warms_vies_client(self, monkeypatch):
+        monkeypatch.setattr(vies, "_async_vies_client", None)
+
+        with TestClient(app) as client:
+            for _ in range(100):
+                if client.get("/api/ready").status_code == 200:
+                    break
+                time.sleep(0.05)
+
+            assert client.get("/api/ready").json() == {"status": "ready"}
+
+    def test_preloaded_app_is_ready_immediately(self, monkeypatch):
+        monkeypatch.setattr(vies, "_async_vies_client", None)
+        monkeypatch.setattr(domains, "_psl", None)
+
+        preload()
+
+        assert domains._psl is not None
+        with TestClient(app) as client:
+            assert client.get("/api/ready").status_code == 200
+
+
+class TestCachedResponses:
+    """Cache hits are served as the stored JSON bytes."""
+
+    def test_search_hit_returns_stored_body(self, client, monkeypatch):
+        monkeypatch.setattr("backends.DDGS", MockDDGS)
+
+        first = client.get("/api/search", params={"query": "Acme"})
+        second = client.get("/api/search", params={"query": "Acme"})
+
+        assert second.content == first.content
+        body = second.json()
+        assert body["total"] == sum(len(urls) for urls in body["results"].values())
+        assert body["rules_version"] == "builtin"
+        assert search_cache_stats()["hits"] == 1
+        assert search_cache_stats()["misses"] == 1
+
+    def test_vat_hit_returns_stored_body(self, client, vies_service):
+        first = client.get("/api/vat/IT12345678903")
+        second = client.get("/api/vat/IT12345678903")
+
+        assert len(vies_service.calls) == 1
+        assert second.content == first.content
+        assert second.json()["company_name"] == "ACME SRL"
+
+
+class TestSearchErrors:
+    """Upstream search failures map to 429 / 503 instead of empty results."""
+
+    def test_rate_limited_search_returns_429(self, client, monkeypatch):
+        monkeypatch.setattr("backends.DDGS", FailingDDGS)
+
+        response = client.get("/api/search", params={"query": "Acme"})
+
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+
+    def test_failed_search_returns_503(self, client, monkeypatch):
+        monkeypatch.setattr("backends.DDGS", BrokenDDGS)
+
+        response = client.get("/api/search", params={"query": "Acme"})
+
+        assert response.status_code == 503
+        assert "connection reset" in response.json()["detail"]
+
+    def test_batch_reports_failures_per_row(self, client, monkeypatch):
+        monkeypatch.setattr("backends.DDGS", BrokenDDGS)
+
+        response = client.post("/api/search/batch", json={"queries": ["Acme"]})
+
+        (row,) = _ndjson(response)
+        assert row["results"] == {}
+        assert "connection reset" in row["error"]
@@ -0,0 +1,207 @@
+"""Tests for the pluggable search backends."""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import search
+from backends import (
+    DDGSBackend,
+    FederatedBackend,
+    FixtureBackend,
+    SearchBackend,
+    create_search_backend,
+)
+from search import search_companies
+
+
+class StaticBackend(SearchBackend):
+    def __init__(self, name, urls, delay=0.0, error=None):
+        self.name = name
+        self.urls = urls
+        self.delay = delay
+        self.error = error
+
+    def search(self, query, max_results, timeout, page=1):
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return [{"href": url} for url in self.urls][:max_results]
+
+
+@pytest.fixture
+def fixture_file(tmp_path):
+    path = tmp_path / "results.json"
+    path.write_text(
+        json.dumps(
+            {
+                "Coca Cola": [
+                    {"href": "https://www.linkedin.com/company/coca-cola"},
+                    {"href": "https://www.amazon.it/dp/coca-cola"},
+                ],
+                "*": [{"href": "https://www.medium.com/@anyone"}],
+            }
+        )
+    )
+    return str(path)
+
+
+def test_fixture_backend_matches_normalized_query(fixture_file):
+    backend = FixtureBackend(fixture_file)
+
+    assert len(backend.search("  coca COLA", max_results=10, timeout=1)) == 2
+    assert backend.search("other", max_results=10, timeout=1) == [
+        {"href": "https://www.medium.com/@anyone"}
+    ]
+    with pytest.raises(LookupError):
+        backend.search("coca cola", max_results=10, timeout=1, page=2)
+
+
+def test_paging_stops_at_max_results_without_repeats(monkeypatch, tmp_path):
+    path = tmp_path / "results.json"
+    path.write_text(json.dumps({"x": [{"href": f"a{i}"} for i in range(10)]}))
+    monkeypatch.setattr(search, "_backend", FixtureBackend(str(path)))
+
+    results = list(search._iter_upstream("x", 7, 5, page_size=4))
+
+    assert [r["href"] for r in results] == [f"a{i}" for i in range(7)]
+
+
+def test_search_companies_with_fixture_backend(monkeypatch, fixture_file):
+    monkeypatch.setattr(search, "_backend", FixtureBackend(fixture_file))
+
+    results = search_companies("Coca Cola", max_results=10)
+
+    assert results == {
+        "social": ["https://www.linkedin.com/company/coca-cola"],
+        "e-commerce": ["https://www.amazon.it/dp/coca-cola"],
+    }
+
+
+def test_federated_backend_interleaves_and_dedupes():
+    backend = FederatedBackend(
+        [
+            StaticBackend("a", ["https://a1", "https://shared"]),
+            StaticBackend("b", ["https://shared", "https://b2"]),
+        ]
+    )
+
+    results = backend.search("q", max_results=10, timeout=1)
+
+    assert [r["href"] for r in results] == [
+        "https://a1",
+        "https://shared",
+        "https://b2",
+    ]
+
+
+def test_federated_backend_returns_what_arrived_by_deadline():
+    backend = FederatedBackend(
+        [
+            StaticBackend("slow", ["https://slow"], delay=0.5),
+            StaticBackend("broken", [], error=RuntimeError("ratelimited")),
+            StaticBackend("fast", ["https://fast"]),
+        ],
+        deadline=0.1,
+    )
+
+    start = time.monotonic()
+    results = backend.search("q", max_results=10, timeout=1)
+
+    assert time.monotonic() - start < 0.4
+    assert results == [{"href": "https://fast"}]
+
+
+def test_federated_backend_fails_when_nothing_answers():
+    backend = FederatedBackend(
+        [StaticBackend("broken", [], error=RuntimeError("ratelimited"))]
+    )
+
+    with pytest.raises(RuntimeError):
+        backend.search("q", max_results=10, timeout=1)
+
+
+def test_federated_backend_is_not_starved_by_a_stalled_backend():
+    release = threading.Event()
+
+    class StalledBackend(SearchBackend):
+        name = "stalled"
+
+        def search(self, query, max_results, timeout, page=1):
+            release.wait(5)
+            return []
+
+    backend = FederatedBackend(
+        [StalledBackend(), StaticBackend("fast", ["https://fast"])],
+        deadline=0.1,
+        max_concurrency=2,
+    )
+
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(backend.search, "q", 10, 1) for _ in range(12)]
+            results = [future.result() for future in futures]
+    finally:
+        release.set()
+
+    assert results == [[{"href": "https://fast"}]] * 12
+
+
+def test_federated_backend_prefers_rate_limit_errors():
+    backend = FederatedBackend(
+        [
+            StaticBackend("throttled", [], error=RuntimeError("202 Ratelimit")),
+            StaticBackend("broken", [], error=ConnectionError("reset")),
+        ]
+    )
+
+    with pytest.raises(RuntimeError, match="Ratelimit"):
+        backend.search("q", max_results=10, timeout=1)
+
+
+def test_federated_backend_reports_partial_throttling():
+    throttled = []
+    backend = FederatedBackend(
+        [
+            StaticBackend("throttled", [], error=RuntimeError("HTTP 429")),
+            StaticBackend("fast", ["https://fast"]),
+        ],
+        on_throttle=lambda backend, error: throttled.append(backend.name),
+    )
+
+    assert backend.search("q", max_results=10, timeout=1) == [{"href": "https://fast"}]
+    assert throttled == ["throttled"]
+
+
+def test_partial_throttling_slows_the_search_limiter(monkeypatch):
+    monkeypatch.setattr(
+        search,
+        "_backend",
+        FederatedBackend(
+            [
+                StaticBackend("throttled", [], error=RuntimeError("HTTP 429")),
+                StaticBackend("fast", ["https://www.linkedin.com/company/x"]),
+            ],
+            on_throttle=search._on_throttle,
+        ),
+    )
+    limiter = search._upstream_limiter
+    monkeypatch.setattr(limiter, "rate", limiter.max_rate)
+    monkeypatch.setattr(limiter, "backoff", 0.0)
+
+    assert search_companies("Throttled Partly Inc")
+    assert limiter.rate == limiter.max_rate / 2
+
+
+def test_create_search_backend_from_specs(fixture_file):
+    assert isinstance(create_search_backend(["ddgs"]), DDGSBackend)
+    assert create_search_backend(["ddgs:bing"]).engine == "bing"
+
+    federated = create_search_backend(["ddgs", f"fixture:{fixture_file}"])
+    assert isinstance(federated, FederatedBackend)
+    assert [b.name for b in federated.backends] == ["ddgs", "fixture"]
+
+    with pytest.raises(ValueError):
+        create_search_backend(["altavista"])
@@ -0,0 +1,157 @@
+"""Tests for the TTL result caches."""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from cache import LRUMemo, MemoryCache, SQLiteCache, TieredCache, create_cache
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache()
+    cache.set_entry("a", b"1", time.time() - 1)
+    cache.set_entry("b", b"2", time.time() + 60)
+
+    assert cache.get_entry("a") is None
+    assert cache.get_entry("b")[0] == b"2"
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    expires = time.time() + 60
+    cache.set_entry("a", b"1", expires)
+    cache.set_entry("b", b"2", expires)
+    cache.get_entry("a")
+    cache.set_entry("c", b"3", expires)
+
+    assert cache.get_entry("b") is None
+    assert cache.get_entry("a") is not None
+    assert cache.get_entry("c") is not None
+
+
+def test_tiered_cache_counts_hits_and_misses():
+    cache = TieredCache(MemoryCache())
+    cache.set("key", b"value", ttl=60)
+
+    assert cache.get("key") == b"value"
+    assert cache.get("missing") is None
+    assert cache.stats.as_dict() == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_tiered_cache_skips_zero_ttl():
+    cache = TieredCache(MemoryCache())
+    cache.set("key", b"value", ttl=0)
+
+    assert cache.get("key") is None
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = TieredCache(MemoryCache(), SQLiteCache(path))
+    first.set("key", b"value", ttl=60)
+    first.store.close()
+
+    second = TieredCache(MemoryCache(), SQLiteCache(path))
+    assert second.get("key") == b"value"
+    # Promoted into memory on the way out
+    assert second.memory.get_entry("key") is not None
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_sqlite_store_reconnects_after_fork(tmp_path):
+    store = SQLiteCache(str(tmp_path / "cache.db"))
+    store.set_entry("parent", b"1", time.time() + 60)
+    parent_conn = store._conn
+
+    pid = os.fork()
+    if pid == 0:
+        # Child: must not touch the parent's connection
+        ok = store.get_entry("parent") is not None and store._conn is not parent_conn
+        store.set_entry("child", b"2", time.time() + 60)
+        os._exit(0 if ok else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert store._conn is parent_conn
+    assert store.get_entry("child")[0] == b"2"
+
+
+def test_sqlite_store_relaxes_fsync_under_wal(tmp_path):
+    store = SQLiteCache(str(tmp_path / "cache.db"))
+    conn = store._connection()
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+
+def test_get_async_reads_the_store_off_the_event_loop(tmp_path):
+    cache = TieredCache(MemoryCache(), SQLiteCache(str(tmp_path / "cache.db")))
+    cache.store.set_entry("key", b"value", time.time() + 60)
+    readers = []
+    get_entry = cache.store.get_entry
+
+    def recording_get_entry(key):
+        readers.append(threading.current_thread())
+        return get_entry(key)
+
+    cache.store.get_entry = recording_get_entry
+
+    async def lookups():
+        return [await cache.get_async(key) for key in ("key", "key", "missing")]
+
+    assert asyncio.run(lookups()) == [b"value", b"value", None]
+    # The second lookup was a memory hit; store reads ran in the pool
+    assert len(readers) == 2
+    assert threading.main_thread() not in readers
+    assert cache.stats.as_dict()["hits"] == 2
+
+
+def test_set_behind_writes_memory_now_and_the_store_later(tmp_path):
+    cache = TieredCache(MemoryCache(), SQLiteCache(str(tmp_path / "cache.db")))
+    writer = ThreadPoolExecutor(max_workers=1)
+
+    async def store():
+        cache.set_behind("key", b"value", ttl=60, executor=writer)
+        return cache.memory.get_entry("key")
+
+    assert asyncio.run(store())[0] == b"value"
+    writer.shutdown(wait=True)
+    assert cache.store.get_entry("key")[0] == b"value"
+
+
+def test_memory_cache_is_bounded_in_bytes():
+    cache = MemoryCache(max_bytes=10)
+    expires = time.time() + 60
+    cache.set_entry("a", b"12345", expires)
+    cache.set_entry("b", b"12345", expires)
+    cache.set_entry("c", b"123", expires)
+
+    assert cache.get_entry("a") is None
+    assert cache.size_bytes == 8
+    # Values larger than the whole budget are never stored
+    cache.set_entry("big", b"x" * 11, expires)
+    assert cache.get_entry("big") is None
+
+
+def test_create_cache_backends(tmp_path):
+    assert create_cache("memory", table="t").store is None
+    sqlite = create_cache("sqlite", table="t", path=str(tmp_path / "c.db"))
+    assert sqlite.store is not None
+    with pytest.raises(ValueError):
+        create_cache("redis", table="t")
+
+
+def test_lru_memo_counts_hits_and_evicts():
+    memo = LRUMemo(max_entries=2)
+    memo.set("a", 1)
+    memo.set("b", 2)
+    memo.get("a")
+    memo.set("c", 3)
+
+    assert memo.get("b") is None
+    assert memo.get("a") == 1
+    assert memo.get("c") == 3
+    assert (memo.stats.hits, memo.stats.misses) == (3, 1)
@@ -0,0 +1,94 @@
+"""Tests for the upstream circuit breakers."""
+
+from circuitbreaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, KeyedCircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _tripped(clock: FakeClock) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CLOSED
+
+
+def test_half_open_lets_one_probe_through():
+    clock = FakeClock()
+    breaker = _tripped(clock)
+    clock.now = 10
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes_circuit():
+    clock = FakeClock()
+    breaker = _tripped(clock)
+    clock.now = 10
+    breaker.allow()
+
+    breaker.record_success()
+
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_circuit():
+    clock = FakeClock()
+    breaker = _tripped(clock)
+    clock.now = 10
+    breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == 10
+
+
+def test_lost_probe_is_replaced_after_timeout():
+    clock = FakeClock()
+    breaker = _tripped(clock)
+    clock.now = 10
+    breaker.allow()
+
+    clock.now = 20
+
+    assert breaker.allow()
+
+
+def test_keys_have_independent_breakers():
+    breakers = KeyedCircuitBreaker(failure_threshold=1, reset_timeout=10)
+
+    breakers.breaker("DE").record_failure()
+
+    assert not breakers.breaker("DE").allow()
+    assert breakers.breaker("IT").allow()
+    assert breakers.states() == {"DE": OPEN, "IT": CLOSED}
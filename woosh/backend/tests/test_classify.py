@@ -1,5 +1,13 @@
 import pytest
-from classify import classify_url
+from classify import (
+    active_rules,
+    classify,
+    classify_url,
+    domain_memo_stats,
+    lookup_domain,
+)
+from config import Rule
+from rules import RuleSet
 
 
 @pytest.mark.parametrize(
@@ -49,3 +57,55 @@ def test_classify_handles_special_characters():
     url = "https://www.linkedin.com/company/example?ref=home"
     expected_category = "social"
     assert classify_url(url) == expected_category
+
+
+def test_classify_returns_priority_and_rule():
+    result = classify("https://www.linkedin.com/company/example")
+    assert result.category == "social"
+    assert result.priority == 10
+    assert result.matched_rule is not None
+    assert result.matched_rule.pattern == "linkedin.com"
+
+
+def test_classify_priority_comes_from_matched_rule():
+    result = classify("https://economy.ilsole24ore.com/article")
+    assert result.category == "finance"
+    assert result.priority == 10
+    assert result.matched_rule.pattern == "ilsole24ore.com"
+
+
+def test_classify_no_match_has_no_rule():
+    result = classify("https://www.unknownsite.com")
+    assert result == ("altro", 0, None)
+
+
+def test_repeated_domains_are_memoized():
+    before = domain_memo_stats()
+
+    classify_url("https://www.linkedin.com/company/a")
+    classify_url("https://WWW.LINKEDIN.COM/company/b")
+
+    stats = domain_memo_stats()
+    assert stats["hits"] == before["hits"] + 1
+    assert stats["misses"] == before["misses"] + 1
+
+
+def test_lookup_reports_excluded_domains():
+    excluded, classification = lookup_domain("it.wikipedia.org")
+
+    assert excluded
+    assert lookup_domain("www.linkedin.com") == (
+        False,
+        classify("https://www.linkedin.com"),
+    )
+    assert classification.category == "altro"
+
+
+def test_other_rule_sets_bypass_the_memo():
+    lookup_domain("www.amazon.it")
+    custom = RuleSet({"shops": [Rule("amazon", priority=3)]}, [])
+
+    _, classification = lookup_domain("www.amazon.it", custom)
+
+    assert classification.category == "shops"
+    assert lookup_domain("www.amazon.it", active_rules())[1].category == "e-commerce"
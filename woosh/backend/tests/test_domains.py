@@ -0,0 +1,49 @@
+"""Tests for host name and registrable domain extraction."""
+
+import pytest
+from domains import PublicSuffixList, hostname, registrable_domain
+
+
+@pytest.mark.parametrize(
+    "host, expected",
+    [
+        ("shop.example.co.uk", "example.co.uk"),
+        ("example.co.uk", "example.co.uk"),
+        ("www.amazon.it", "amazon.it"),
+        ("it.finance.yahoo.com", "yahoo.com"),
+        ("agenziadelleentrate.gov.it", "agenziadelleentrate.gov.it"),
+        # Private suffixes keep hosted sites apart
+        ("acme.blogspot.com", "acme.blogspot.com"),
+        # Unlisted TLDs behave like the implicit "*" rule
+        ("www.example.unknowntld", "example.unknowntld"),
+        # Nothing to register: returned as is
+        ("co.uk", "co.uk"),
+        ("localhost", "localhost"),
+        ("192.168.1.10", "192.168.1.10"),
+        ("", ""),
+    ],
+)
+def test_registrable_domain(host, expected):
+    assert registrable_domain(host) == expected
+
+
+def test_wildcard_and_exception_rules():
+    psl = PublicSuffixList(["// comment", "*.ck", "!www.ck", "", "com"])
+
+    assert psl.registrable_domain("a.b.ck") == "a.b.ck"
+    assert psl.registrable_domain("b.ck") is None
+    assert psl.registrable_domain("www.ck") == "www.ck"
+    assert psl.registrable_domain("shop.example.com") == "example.com"
+
+
+@pytest.mark.parametrize(
+    "netloc, expected",
+    [
+        ("WWW.Example.com", "www.example.com"),
+        ("user:secret@example.com:8080", "example.com"),
+        ("example.com.", "example.com"),
+        ("[::1]:8000", "[::1]"),
+    ],
+)
+def test_hostname(netloc, expected):
+    assert hostname(netloc) == expected
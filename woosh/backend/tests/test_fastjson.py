@@ -0,0 +1,20 @@
+"""Tests for the JSON encoding helpers."""
+
+import fastjson
+import pytest
+
+DOCUMENT = {"results": {"altro": ["https://caffè.example/ä"]}, "total": 1, "ok": True}
+
+
+def test_round_trip():
+    assert fastjson.loads(fastjson.dumps(DOCUMENT)) == DOCUMENT
+
+
+def test_stdlib_fallback_matches_orjson(monkeypatch):
+    pytest.importorskip("orjson")
+    encoded = fastjson.dumps(DOCUMENT)
+
+    monkeypatch.setattr(fastjson, "orjson", None)
+
+    assert fastjson.dumps(DOCUMENT) == encoded
+    assert fastjson.loads(encoded) == DOCUMENT
@@ -0,0 +1,110 @@
+"""Tests for the compiled rule matcher."""
+
+import pytest
+from config import EXCLUDED, RULES, Rule
+from matcher import RuleMatcher
+
+
+def _linear_match(rules, domain):
+    """Reference implementation: the original per-Rule linear scan."""
+    for category, category_rules in rules.items():
+        for rule in category_rules:
+            if rule.matches(domain):
+                return category, rule
+    return None
+
+
+DOMAINS = [
+    "www.linkedin.com",
+    "agenziadelleentrate.gov.it",
+    "www.amazon.co.uk",
+    "economy.ilsole24ore.com",
+    "sanita24.ilsole24ore.com",
+    "x.com",
+    "news.x.com",
+    "www.salute.gov.it",
+    "registroimprese.it",
+    "microsoft.com",
+    "www.medium.com",
+    "127.0.0.1",
+    "shop.local",
+    "local.example.org",
+    "www.ft.com",
+    "it.tripadvisor.com",
+    "ft.com.evil.net",
+    "linkedin.com.evil-phish.ru",
+    "www.yellowpages.ca",
+    "",
+]
+
+
+@pytest.mark.parametrize("domain", DOMAINS)
+def test_matches_linear_scan(domain):
+    matcher = RuleMatcher(RULES)
+    assert matcher.match(domain) == _linear_match(RULES, domain)
+
+
+@pytest.mark.parametrize("domain", DOMAINS)
+def test_matches_linear_scan_for_exclusions(domain):
+    rules = {"excluded": EXCLUDED}
+    matcher = RuleMatcher(rules)
+    assert matcher.match(domain) == _linear_match(rules, domain)
+
+
+def test_first_category_wins():
+    rules = {
+        "first": [Rule("myshop", priority=1)],
+        "second": [Rule("myshop.com", priority=10)],
+    }
+    category, rule = RuleMatcher(rules).match("www.myshop.com")
+    assert category == "first"
+    assert rule.priority == 1
+
+
+def test_regex_rule_ordered_before_literal():
+    rules = {
+        "regex": [Rule(r"\.gov\.it$", is_regex=True, priority=10)],
+        "literal": [Rule("salute.gov.it", priority=5)],
+    }
+    category, _ = RuleMatcher(rules).match("www.salute.gov.it")
+    assert category == "regex"
+
+
+def test_overlapping_patterns_use_failure_links():
+    rules = {"a": [Rule("a.b.c")], "b": [Rule("b.d")]}
+    category, _ = RuleMatcher(rules).match("a.b.d")
+    assert category == "b"
+
+
+def test_no_match_returns_none():
+    assert RuleMatcher(RULES).match("unknownsite.org") is None
+
+
+def test_lookalike_domains_do_not_match():
+    matcher = RuleMatcher(RULES)
+    assert matcher.match("linkedin.com.evil-phish.ru") is None
+    assert matcher.match("ft.com.example.org") is None
+
+
+@pytest.mark.parametrize(
+    "pattern, domain, expected",
+    [
+        ("ft.com", "ft.com", True),
+        ("ft.com", "www.ft.com", True),
+        ("ft.com", "microsoft.com", False),
+        ("ft.com", "ft.community.org", False),
+        ("ft.com", "ft.com.example.org", False),
+        ("linkedin.com", "linkedin.com.evil-phish.ru", False),
+        ("yellowpages", "www.yellowpages.ca", True),
+        ("yellowpages", "myyellowpages.com", False),
+        ("yellowpages", "yellowpages.example.org", True),
+        (".local", "printer.local", True),
+        (".local", "local.example.org", False),
+    ],
+)
+def test_literals_match_whole_labels_and_dotted_ones_as_suffixes(
+    pattern, domain, expected
+):
+    rule = Rule(pattern)
+    assert rule.matches(domain) is expected
+    assert (RuleMatcher({"c": [rule]}).match(domain) is not None) is expected
@@ -0,0 +1,97 @@
+"""Tests for the Prometheus-style metrics."""
+
+import asyncio
+import socket
+
+import pytest
+import vies
+from app import app
+from fastapi.testclient import TestClient
+from metrics import UPSTREAM_ERRORS, Counter, Histogram, _registry, error_type, render
+from search import SearchRateLimitedError, search_companies
+from test_search import FailingDDGS, MockDDGS
+from test_vies import FakeAsyncService, _fake_async_client
+from zeep.exceptions import Fault
+
+
+@pytest.fixture
+def local_metrics():
+    """Metrics created by a test are dropped from the global registry after it."""
+    registered = list(_registry)
+    yield
+    _registry[:] = registered
+
+
+def test_counter_renders_labelled_samples(local_metrics):
+    counter = Counter("test_events_total", "Events", ["kind"])
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+    counter.inc(kind="b")
+
+    text = render()
+    assert "# TYPE test_events_total counter" in text
+    assert 'test_events_total{kind="a"} 3' in text
+    assert 'test_events_total{kind="b"} 1' in text
+
+
+def test_histogram_buckets_are_cumulative(local_metrics):
+    histogram = Histogram("test_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    text = render()
+    assert 'test_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_seconds_bucket{le="1.0"} 2' in text
+    assert 'test_seconds_bucket{le="+Inf"} 3' in text
+    assert "test_seconds_count 3" in text
+    assert "test_seconds_sum 5.55" in text
+
+
+def test_error_type_buckets_upstream_failures():
+    assert error_type(Fault("MS_UNAVAILABLE")) == "fault"
+    assert error_type(socket.timeout("timed out")) == "timeout"
+    assert error_type(ConnectionRefusedError()) == "connection"
+    assert error_type(RuntimeError("202 Ratelimit")) == "rate_limit"
+    assert error_type(RuntimeError("boom")) == "other"
+
+
+def test_search_failures_are_counted(monkeypatch):
+    monkeypatch.setattr("backends.DDGS", FailingDDGS)
+    before = UPSTREAM_ERRORS.value(service="search", type="rate_limit")
+
+    with pytest.raises(SearchRateLimitedError):
+        search_companies("Acme")
+
+    assert UPSTREAM_ERRORS.value(service="search", type="rate_limit") == before + 1
+
+
+def test_vies_faults_are_counted(monkeypatch):
+    service = FakeAsyncService(fault=True)
+    monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+    before = UPSTREAM_ERRORS.value(service="vies", type="fault")
+
+    asyncio.run(vies.validate_vat_async("IT00743110157"))
+
+    # The first attempt and every retry
+    expected = before + 1 + vies.VIES_RETRIES
+    assert UPSTREAM_ERRORS.value(service="vies", type="fault") == expected
+
+
+def test_metrics_endpoint_exposes_stages_and_caches(monkeypatch):
+    monkeypatch.setattr("backends.DDGS", MockDDGS)
+    client = TestClient(app)
+    client.get("/api/search", params={"query": "Acme"})
+    client.get("/api/search", params={"query": "Acme"})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'woosh_stage_seconds_count{stage="search_fetch"}' in response.text
+    assert 'woosh_stage_seconds_count{stage="search_classify"}' in response.text
+    assert 'woosh_cache_hits_total{cache="search"} 1' in response.text
+    assert 'woosh_singleflight_keys{flight="vat"} 0' in response.text
+    assert (
+        'woosh_http_request_seconds_count{method="GET",route="/api/search"}'
+        in response.text
+    )
@@ -0,0 +1,97 @@
+"""Tests for upstream rate limiting."""
+
+import asyncio
+import time
+
+from ratelimit import AdaptiveTokenBucket, KeyedRateLimiter, TokenBucket
+
+
+def test_burst_is_immediate():
+    bucket = TokenBucket(rate=1, capacity=3)
+
+    start = time.monotonic()
+    asyncio.run(asyncio.wait_for(_acquire_many(bucket, 3), timeout=1))
+
+    assert time.monotonic() - start < 0.1
+
+
+def test_waiters_are_spaced_by_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+
+    start = time.monotonic()
+    asyncio.run(_acquire_many(bucket, 5))
+
+    # First token is free, the remaining four wait 1/20s each
+    assert time.monotonic() - start >= 0.19
+
+
+def test_keys_have_independent_buckets():
+    limiter = KeyedRateLimiter(rate=1, capacity=1)
+
+    async def acquire_both():
+        await limiter.acquire("IT")
+        await limiter.acquire("DE")
+
+    start = time.monotonic()
+    asyncio.run(acquire_both())
+
+    assert time.monotonic() - start < 0.1
+
+
+def test_wait_refuses_past_max_wait_without_taking_a_token():
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.wait()
+
+    assert not bucket.wait(max_wait=0.1)
+    assert 0.5 < bucket.wait_time() <= 1
+
+
+def test_cancelled_waiter_returns_its_token():
+    bucket = TokenBucket(rate=1, capacity=1)
+
+    async def cancel_waiters():
+        waiters = [asyncio.ensure_future(bucket.acquire()) for _ in range(100)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    asyncio.run(cancel_waiters())
+
+    # Only the immediate token was spent
+    assert bucket.wait_time() <= 1
+
+
+def test_throttle_halves_rate_and_pauses():
+    bucket = AdaptiveTokenBucket(max_rate=8, backoff=2)
+
+    pause = bucket.on_throttle()
+
+    assert pause == 2
+    assert bucket.rate == 4
+    assert bucket.wait_time() > 1.9
+
+
+def test_throttles_during_a_pause_count_once():
+    bucket = AdaptiveTokenBucket(max_rate=8, backoff=2)
+
+    bucket.on_throttle()
+    bucket.on_throttle()
+
+    assert bucket.rate == 4
+
+
+def test_successes_restore_rate_up_to_max():
+    bucket = AdaptiveTokenBucket(max_rate=10, min_rate=1, backoff=0)
+    for _ in range(5):
+        bucket.on_throttle()
+    assert bucket.rate == 1
+
+    for _ in range(20):
+        bucket.on_success()
+
+    assert bucket.rate == 10
+
+
+async def _acquire_many(bucket, count):
+    await asyncio.gather(*(bucket.acquire() for _ in range(count)))
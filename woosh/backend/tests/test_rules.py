@@ -0,0 +1,235 @@
+"""Tests for loading, validating and hot-swapping rule sets."""
+
+import asyncio
+import json
+
+import classify
+import pytest
+from app import app
+from classify import active_rules, classify_url, reload_rules, watch_rules_file
+from fastapi.testclient import TestClient
+from rules import BUILTIN_VERSION, RulesError, load_rules, parse_rules
+from search import search_companies
+from test_search import CountingDDGS
+
+RULES_JSON = {
+    "version": "v2",
+    "rules": {
+        "social": [{"pattern": "linkedin.com", "priority": 10}],
+        "istituzionali": [{"pattern": r"\.gov\.it$", "is_regex": True, "priority": 10}],
+    },
+    "excluded": [{"pattern": "example.com"}],
+}
+
+RULES_YAML = """
+rules:
+  social:
+    - pattern: linkedin.com
+      priority: 10
+excluded:
+  - pattern: wikipedia.org
+"""
+
+RULES_TOML = """
+version = "toml-1"
+
+[[rules.social]]
+pattern = "linkedin.com"
+priority = 10
+
+[[rules.istituzionali]]
+pattern = '\\.gov\\.it$'
+is_regex = true
+priority = 10
+"""
+
+
+@pytest.fixture(autouse=True)
+def restore_rules():
+    """Tests may swap the active rules; put the built-in ones back after."""
+    previous = active_rules()
+    yield
+    classify.set_rules(previous)
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    """Enable the admin endpoints; returns the headers to authenticate."""
+    monkeypatch.setattr("app.ADMIN_TOKEN", "s3cret")
+    return {"Authorization": "Bearer s3cret"}
+
+
+@pytest.fixture
+def rule_file(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(RULES_JSON))
+    return path
+
+
+class TestLoadRules:
+    """Tests for parsing and validating rule files."""
+
+    def test_json_file(self, rule_file):
+        ruleset = load_rules(str(rule_file))
+
+        assert ruleset.version == "v2"
+        assert ruleset.match("www.linkedin.com")[0] == "social"
+        assert ruleset.match("agenziadelleentrate.gov.it")[0] == "istituzionali"
+        assert ruleset.is_excluded("www.example.com")
+        assert ruleset.max_priority("social") == 10
+
+    def test_yaml_file_defaults_version_to_content_hash(self, tmp_path):
+        path = tmp_path / "rules.yaml"
+        path.write_text(RULES_YAML)
+
+        ruleset = load_rules(str(path))
+
+        assert ruleset.version != BUILTIN_VERSION
+        assert len(ruleset.version) == 12
+        assert ruleset.is_excluded("it.wikipedia.org")
+
+    def test_toml_file(self, tmp_path):
+        path = tmp_path / "rules.toml"
+        path.write_text(RULES_TOML)
+
+        ruleset = load_rules(str(path))
+
+        assert ruleset.version == "toml-1"
+        assert ruleset.match("inps.gov.it")[0] == "istituzionali"
+
+    @pytest.mark.parametrize(
+        "data, message",
+        [
+            ([], "top level"),
+            ({"rules": {}}, "'rules'"),
+            ({"rules": {"social": "linkedin.com"}}, "list of rules"),
+            ({"rules": {"social": [{"priority": 1}]}}, "'pattern'"),
+            ({"rules": {"social": [{"pattern": "x", "weight": 1}]}}, "unknown keys"),
+            ({"rules": {"social": [{"pattern": "x", "priority": "high"}]}}, "integer"),
+            ({"rules": {"social": [{"pattern": "(", "is_regex": True}]}}, "regex"),
+            ({"rules": {"social": []}, "extra": 1}, "top-level"),
+        ],
+    )
+    def test_invalid_documents_are_rejected(self, data, message):
+        with pytest.raises(RulesError, match=message):
+            parse_rules(data, "v")
+
+    def test_unsupported_file_type(self, tmp_path):
+        path = tmp_path / "rules.ini"
+        path.write_text("")
+
+        with pytest.raises(RulesError, match="unsupported"):
+            load_rules(str(path))
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(RulesError, match="cannot read"):
+            load_rules(str(tmp_path / "missing.json"))
+
+
+class TestReload:
+    """Tests for swapping the active rule set."""
+
+    def test_reload_changes_classification(self, rule_file):
+        assert classify_url("https://www.amazon.it/dp/x") == "e-commerce"
+
+        reload_rules(str(rule_file))
+
+        assert active_rules().version == "v2"
+        assert classify_url("https://www.amazon.it/dp/x") == "altro"
+
+    def test_invalid_file_keeps_active_rules(self, tmp_path):
+        path = tmp_path / "rules.json"
+        path.write_text('{"rules": {"social": [{"pattern": ""}]}}')
+
+        with pytest.raises(RulesError):
+            reload_rules(str(path))
+
+        assert active_rules().version == BUILTIN_VERSION
+
+    def test_cached_searches_are_not_served_after_a_rule_change(
+        self, rule_file, monkeypatch
+    ):
+        CountingDDGS.calls = 0
+        monkeypatch.setattr("backends.DDGS", CountingDDGS)
+
+        before = search_companies("Acme", max_results=10)
+        reload_rules(str(rule_file))
+        after = search_companies("Acme", max_results=10)
+
+        assert CountingDDGS.calls == 2
+        assert "e-commerce" in before
+        assert "e-commerce" not in after
+
+    def test_watcher_reloads_changed_file(self, tmp_path):
+        path = tmp_path / "rules.json"
+        path.write_text(json.dumps({**RULES_JSON, "version": "v1"}))
+
+        async def edit_and_wait():
+            watcher = asyncio.create_task(watch_rules_file(str(path), 0.01))
+            await asyncio.sleep(0.05)
+            path.write_text(json.dumps({**RULES_JSON, "version": "v10"}))
+            for _ in range(100):
+                if active_rules().version == "v10":
+                    break
+                await asyncio.sleep(0.01)
+            watcher.cancel()
+
+        asyncio.run(edit_and_wait())
+
+        assert active_rules().version == "v10"
+
+
+class TestRulesEndpoints:
+    """Tests for the rules API and the version header."""
+
+    def test_reload_endpoint_swaps_rules(self, rule_file, admin, monkeypatch):
+        monkeypatch.setattr(classify, "RULES_FILE", str(rule_file))
+        client = TestClient(app)
+
+        response = client.post("/api/admin/rules/reload", headers=admin)
+
+        assert response.status_code == 200
+        assert response.json()["version"] == "v2"
+        assert response.json()["categories"] == {"social": 1, "istituzionali": 1}
+        assert client.get("/api/rules").headers["X-Rules-Version"] == "v2"
+
+    def test_reload_endpoint_rejects_invalid_file(self, tmp_path, admin, monkeypatch):
+        path = tmp_path / "rules.json"
+        path.write_text("{not json")
+        monkeypatch.setattr(classify, "RULES_FILE", str(path))
+        client = TestClient(app)
+
+        response = client.post("/api/admin/rules/reload", headers=admin)
+
+        assert response.status_code == 400
+        assert "cannot parse" in response.json()["detail"]
+        assert client.get("/api/rules").json()["version"] == BUILTIN_VERSION
+
+    def test_reload_endpoint_is_disabled_without_token(self, monkeypatch):
+        monkeypatch.setattr("app.ADMIN_TOKEN", None)
+
+        response = TestClient(app).post("/api/admin/rules/reload")
+
+        assert response.status_code == 404
+
+    def test_reload_endpoint_rejects_wrong_token(self, admin, monkeypatch):
+        reloads = []
+        monkeypatch.setattr("app.reload_rules", lambda: reloads.append(1))
+        client = TestClient(app)
+
+        missing = client.post("/api/admin/rules/reload")
+        wrong = client.post(
+            "/api/admin/rules/reload", headers={"Authorization": "Bearer nope"}
+        )
+
+        assert missing.status_code == wrong.status_code == 401
+        assert reloads == []
+
+    def test_search_response_reports_rules_version(self, monkeypatch):
+        monkeypatch.setattr("backends.DDGS", CountingDDGS)
+        client = TestClient(app)
+
+        response = client.get("/api/search", params={"query": "Acme"})
+
+        assert response.json()["rules_version"] == BUILTIN_VERSION
+        assert response.headers["X-Rules-Version"] == BUILTIN_VERSION
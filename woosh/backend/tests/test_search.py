@@ -1,6 +1,23 @@
+import asyncio
+import threading
+import time
 from typing import Any, Optional
 
-from search import search_companies
+import pytest
+import search
+from cache import create_cache
+from config import SEARCH_RETRIES
+from ratelimit import AdaptiveTokenBucket
+from search import (
+    SearchRateLimitedError,
+    SearchUnavailableError,
+    iter_search_events,
+    merge_results,
+    search_cache_stats,
+    search_companies,
+    search_companies_async,
+    search_companies_batch,
+)
 
 
 class MockDDGS:
@@ -34,7 +51,7 @@ class MockDDGS:
 
 def test_search_companies(monkeypatch: Any) -> None:
     # Patch DDGS to use the mock class
-    monkeypatch.setattr("search.DDGS", MockDDGS)
+    monkeypatch.setattr("backends.DDGS", MockDDGS)
 
     query = "Coca Cola"
     results = search_companies(query, max_results=10)
@@ -46,3 +63,356 @@ def test_search_companies(monkeypatch: Any) -> None:
         "altro": ["https://www.medium.com/@coca-cola"],
     }
     assert results == expected_results
+
+
+def test_search_companies_async(monkeypatch: Any) -> None:
+    monkeypatch.setattr("backends.DDGS", MockDDGS)
+
+    results = asyncio.run(search_companies_async("Pirelli", max_results=10))
+
+    assert results["social"] == ["https://www.linkedin.com/company/pirelli"]
+    assert results["altro"] == ["https://www.medium.com/@pirelli"]
+
+
+def test_search_companies_async_concurrent_callers(monkeypatch: Any) -> None:
+    monkeypatch.setattr("backends.DDGS", MockDDGS)
+
+    async def run_all():
+        queries = [f"Company {i}" for i in range(20)]
+        return await asyncio.gather(
+            *(search_companies_async(q, max_results=10) for q in queries)
+        )
+
+    all_results = asyncio.run(run_all())
+
+    assert len(all_results) == 20
+    assert all_results[3]["social"] == ["https://www.linkedin.com/company/company-3"]
+
+
+class CountingDDGS(MockDDGS):
+    calls = 0
+
+    def text(self, query: str, max_results: int = 10):
+        CountingDDGS.calls += 1
+        return super().text(query, max_results)
+
+
+class FailingDDGS(MockDDGS):
+    calls = 0
+
+    def text(self, query: str, max_results: int = 10):
+        FailingDDGS.calls += 1
+        raise RuntimeError("202 Ratelimit")
+
+
+def test_search_cache_uses_normalized_query(monkeypatch: Any) -> None:
+    CountingDDGS.calls = 0
+    monkeypatch.setattr("backends.DDGS", CountingDDGS)
+
+    first = search_companies("Coca Cola", max_results=10)
+    second = search_companies("  coca   COLA ", max_results=10)
+
+    assert CountingDDGS.calls == 1
+    assert second == first
+    assert search_cache_stats()["hits"] == 1
+
+
+def test_search_cache_keys_on_ranking_parameters(monkeypatch: Any) -> None:
+    CountingDDGS.calls = 0
+    monkeypatch.setattr("backends.DDGS", CountingDDGS)
+
+    search_companies("Ferrari", max_results=10)
+    search_companies("Ferrari", max_results=20)
+
+    assert CountingDDGS.calls == 2
+
+
+class BrokenDDGS(MockDDGS):
+    def text(self, query: str, max_results: int = 10):
+        raise RuntimeError("connection reset")
+
+
+def test_search_failures_are_not_cached(monkeypatch: Any) -> None:
+    monkeypatch.setattr("backends.DDGS", BrokenDDGS)
+    with pytest.raises(SearchUnavailableError):
+        search_companies("Ferrari", max_results=10)
+
+    monkeypatch.setattr("backends.DDGS", MockDDGS)
+    assert search_companies("Ferrari", max_results=10)
+
+
+def test_rate_limited_searches_back_off_then_give_up(monkeypatch: Any) -> None:
+    FailingDDGS.calls = 0
+    monkeypatch.setattr("backends.DDGS", FailingDDGS)
+
+    with pytest.raises(SearchRateLimitedError):
+        search_companies("Ferrari", max_results=10)
+
+    assert FailingDDGS.calls == 1 + SEARCH_RETRIES
+    # Each throttle halved the pace
+    assert search._upstream_limiter.rate < search._upstream_limiter.max_rate
+
+
+def test_search_refused_when_queue_wait_is_too_long(monkeypatch: Any) -> None:
+    CountingDDGS.calls = 0
+    monkeypatch.setattr("backends.DDGS", CountingDDGS)
+    monkeypatch.setattr("search.SEARCH_QUEUE_MAX_WAIT", 0.5)
+    limiter = AdaptiveTokenBucket(1, backoff=30)
+    limiter.on_throttle()
+    monkeypatch.setattr("search._upstream_limiter", limiter)
+
+    with pytest.raises(SearchRateLimitedError) as refused:
+        search_companies("Ferrari", max_results=10)
+
+    assert CountingDDGS.calls == 0
+    assert refused.value.retry_after > 29
+
+
+class SlowDDGS(CountingDDGS):
+    def text(self, query: str, max_results: int = 10):
+        time.sleep(0.1)
+        return super().text(query, max_results)
+
+
+def test_concurrent_identical_searches_are_coalesced(monkeypatch: Any) -> None:
+    CountingDDGS.calls = 0
+    monkeypatch.setattr("backends.DDGS", SlowDDGS)
+
+    async def run_all():
+        return await asyncio.gather(
+            *(search_companies_async("Lavazza ", max_results=10) for _ in range(10)),
+            *(search_companies_async("lavazza", max_results=10) for _ in range(10)),
+        )
+
+    all_results = asyncio.run(run_all())
+
+    assert CountingDDGS.calls == 1
+    assert all(results == all_results[0] for results in all_results)
+
+
+def test_search_cache_store_is_read_off_the_event_loop(
+    monkeypatch: Any, tmp_path: Any
+) -> None:
+    cache = create_cache("sqlite", table="search", path=str(tmp_path / "s.db"))
+    monkeypatch.setattr(search, "_search_cache", cache)
+    monkeypatch.setattr("backends.DDGS", CountingDDGS)
+    CountingDDGS.calls = 0
+    expected = search_companies("Coca Cola", max_results=10)
+    cache.memory.clear()
+    readers = []
+    get_entry = cache.store.get_entry
+
+    def recording_get_entry(key: str) -> Any:
+        readers.append(threading.current_thread())
+        return get_entry(key)
+
+    monkeypatch.setattr(cache.store, "get_entry", recording_get_entry)
+
+    results = asyncio.run(search_companies_async("Coca Cola", max_results=10))
+
+    assert results == expected
+    assert CountingDDGS.calls == 1
+    assert readers and threading.main_thread() not in readers
+
+
+class PagedMockDDGS(MockDDGS):
+    """Serves MockDDGS results two per page, like a paginated engine."""
+
+    pages: list = []
+
+    def text(self, query: str, max_results: int = 10, page: int = 1):
+        PagedMockDDGS.pages.append(page)
+        results = super().text(query, max_results)
+        batch = results[(page - 1) * 2 : page * 2][:max_results]
+        if not batch:
+            raise RuntimeError("No results found.")
+        return batch
+
+
+def test_iter_search_events_streams_then_ranks(monkeypatch: Any) -> None:
+    PagedMockDDGS.pages = []
+    monkeypatch.setattr("backends.DDGS", PagedMockDDGS)
+    monkeypatch.setattr("search.SEARCH_PAGE_SIZE", 2)
+
+    events = list(iter_search_events("Coca Cola", max_results=10))
+
+    assert [e["event"] for e in events] == ["result"] * 4 + ["ranked"]
+    assert events[0] == {
+        "event": "result",
+        "category": "social",
+        "url": "https://www.linkedin.com/company/coca-cola",
+        "priority": 10,
+    }
+    assert events[-1]["total"] == 4
+    assert events[-1]["results"]["altro"] == ["https://www.medium.com/@coca-cola"]
+    assert PagedMockDDGS.pages == [1, 2, 3]
+
+
+def test_stream_releases_upstream_slot_between_pages(monkeypatch: Any) -> None:
+    monkeypatch.setattr("backends.DDGS", PagedMockDDGS)
+    monkeypatch.setattr("search.SEARCH_PAGE_SIZE", 2)
+
+    async def read_slowly():
+        stream = search.iter_search_events_async("Coca Cola", max_results=10)
+        first = await stream.__anext__()
+        # The consumer is holding a page's events: no slot should be taken
+        free = search._get_search_semaphore()._value
+        await stream.aclose()
+        return first, free
+
+    first, free = asyncio.run(read_slowly())
+
+    assert first["event"] == "result"
+    assert free == search.SEARCH_MAX_CONCURRENCY
+
+
+def test_iter_search_events_uses_cache(monkeypatch: Any) -> None:
+    monkeypatch.setattr("backends.DDGS", MockDDGS)
+    expected = search_companies("Coca Cola", max_results=10)
+
+    events = list(iter_search_events("coca cola", max_results=10))
+
+    assert events == [{"event": "ranked", "results": expected, "total": 4}]
+
+
+def test_iter_search_events_reports_failure(monkeypatch: Any) -> None:
+    monkeypatch.setattr("backends.DDGS", FailingDDGS)
+
+    events = list(iter_search_events("Ferrari", max_results=10))
+
+    assert [e["event"] for e in events] == ["error", "ranked"]
+    assert events[-1]["results"] == {}
+
+
+class TimeoutOnPage2DDGS(PagedMockDDGS):
+    def text(self, query: str, max_results: int = 10, page: int = 1):
+        if page == 2:
+            raise TimeoutError("read timed out")
+        return super().text(query, max_results, page)
+
+
+def test_stream_reports_failure_on_a_later_page(monkeypatch: Any) -> None:
+    monkeypatch.setattr("backends.DDGS", TimeoutOnPage2DDGS)
+    monkeypatch.setattr("search.SEARCH_PAGE_SIZE", 2)
+
+    events = list(iter_search_events("Coca Cola", max_results=10))
+
+    assert [e["event"] for e in events] == ["result"] * 2 + ["error", "ranked"]
+    assert (
+        search._search_cache.peek(search._search_cache_key("Coca Cola", 10, 5)) is None
+    )
+
+
+def test_search_failing_on_a_later_page_is_not_cached(monkeypatch: Any) -> None:
+    monkeypatch.setattr("backends.DDGS", TimeoutOnPage2DDGS)
+    monkeypatch.setattr("search.SEARCH_PAGE_SIZE", 2)
+
+    with pytest.raises(SearchUnavailableError):
+        search_companies("Coca Cola", max_results=10, categories=["altro"])
+    assert search_cache_stats()["entries"] == 0
+
+
+class ManyPagesDDGS(MockDDGS):
+    """Two max-priority social hits and one other result per page, forever."""
+
+    pages: list = []
+
+    def text(self, query: str, max_results: int = 10, page: int = 1):
+        ManyPagesDDGS.pages.append(page)
+        return [
+            {"href": f"https://www.linkedin.com/company/{query}-{page}"},
+            {"href": f"https://www.facebook.com/{query}-{page}"},
+            {"href": f"https://www.medium.com/@{query}-{page}"},
+        ][:max_results]
+
+
+def test_search_stops_once_categories_are_saturated(monkeypatch: Any) -> None:
+    ManyPagesDDGS.pages = []
+    monkeypatch.setattr("backends.DDGS", ManyPagesDDGS)
+    monkeypatch.setattr("search.SEARCH_PAGE_SIZE", 3)
+
+    results = search_companies(
+        "acme", max_results=100, top_per_category=2, categories=["social"]
+    )
+
+    assert list(results) == ["social"]
+    assert len(results["social"]) == 2
+    assert ManyPagesDDGS.pages == [1]
+
+
+def test_search_respects_time_budget_and_skips_cache(monkeypatch: Any) -> None:
+    ManyPagesDDGS.pages = []
+    monkeypatch.setattr("backends.DDGS", ManyPagesDDGS)
+    monkeypatch.setattr("search.SEARCH_PAGE_SIZE", 3)
+    clock = iter(range(0, 1000, 5))
+    monkeypatch.setattr("search.time.monotonic", lambda: next(clock))
+    # The limiter shares the patched clock: start it on the fake timeline too
+    monkeypatch.setattr("search._upstream_limiter", AdaptiveTokenBucket(1e6))
+
+    results = search_companies("acme", max_results=100, time_budget=4)
+
+    assert ManyPagesDDGS.pages == [1]
+    assert results["social"] == ["https://www.linkedin.com/company/acme-1"]
+    assert search_cache_stats()["entries"] == 0
+
+
+def test_search_companies_batch_dedupes_and_reuses_cache(monkeypatch: Any) -> None:
+    CountingDDGS.calls = 0
+    monkeypatch.setattr("backends.DDGS", CountingDDGS)
+    search_companies("Barilla", max_results=10)
+
+    async def collect():
+        return [
+            item
+            async for item in search_companies_batch(
+                ["Barilla", "Ferrero", " ferrero ", "FERRERO", ""], max_results=10
+            )
+        ]
+
+    rows = {query: results for query, results, _ in asyncio.run(collect())}
+
+    assert sorted(rows) == ["Barilla", "Ferrero"]
+    assert rows["Ferrero"] == search_companies("ferrero", max_results=10)
+    # One call for the warm-up, one for Ferrero; Barilla came from the cache
+    assert CountingDDGS.calls == 2
+
+
+def test_merge_results_prefers_earlier_sets_and_dedupes_domains() -> None:
+    merged = merge_results(
+        {"social": ["https://www.linkedin.com/company/acme"]},
+        {
+            "social": [
+                "https://it.linkedin.com/company/acme-spa",
+                "https://twitter.com/acme",
+            ],
+            "news": ["https://www.ansa.it/acme"],
+        },
+        top_per_category=2,
+    )
+
+    assert merged == {
+        "social": ["https://www.linkedin.com/company/acme", "https://twitter.com/acme"],
+        "news": ["https://www.ansa.it/acme"],
+    }
+
+
+class SubdomainDDGS(MockDDGS):
+    def text(self, query: str, max_results: int = 10):
+        return [
+            {"href": "https://shop.acme.co.uk/catalogue"},
+            {"href": "https://www.acme.co.uk/about"},
+            {"href": "https://acme.blogspot.com/"},
+            {"href": "https://other.blogspot.com/"},
+        ]
+
+
+def test_results_are_deduplicated_by_registrable_domain(monkeypatch: Any) -> None:
+    monkeypatch.setattr("backends.DDGS", SubdomainDDGS)
+
+    results = search_companies("Acme", max_results=10)
+
+    assert results["altro"] == [
+        "https://shop.acme.co.uk/catalogue",
+        "https://acme.blogspot.com/",
+        "https://other.blogspot.com/",
+    ]
@@ -0,0 +1,77 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def slow_fetch(value):
+        calls.append(value)
+        time.sleep(0.1)
+        return value * 2
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("k", slow_fetch, 21)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [21]
+    assert results == [42] * 5
+    assert flight.in_flight() == 0
+
+
+def test_exception_is_shared_and_not_remembered():
+    flight = SingleFlight()
+
+    def boom():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("k", boom)
+    assert flight.do("k", lambda: "ok") == "ok"
+
+
+def test_concurrent_coroutines_share_one_call():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def slow_fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value * 2
+
+    async def run_all():
+        return await asyncio.gather(*(flight.do("k", slow_fetch, 21) for _ in range(5)))
+
+    assert asyncio.run(run_all()) == [42] * 5
+    assert calls == [21]
+    assert flight.in_flight() == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = AsyncSingleFlight()
+
+    async def slow_fetch():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        impatient = asyncio.ensure_future(flight.do("k", slow_fetch))
+        patient = asyncio.ensure_future(flight.do("k", slow_fetch))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(run()) == "done"
@@ -0,0 +1,56 @@
+"""Tests for backend import time: heavy dependencies stay out of startup."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Seconds `import app` may take in a fresh interpreter. About 0.55s on a
+# developer laptop, most of it FastAPI; override on slow CI machines.
+IMPORT_BUDGET = float(os.environ.get("WOOSH_IMPORT_BUDGET", "2.0"))
+
+# Only needed once a search or VIES lookup actually runs
+LAZY_MODULES = ["ddgs", "primp", "zeep", "lxml", "httpx", "yaml"]
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+@pytest.fixture(scope="module")
+def startup():
+    """Import the app in a fresh interpreter (best of three runs)."""
+    runs = []
+    for _ in range(3):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return min(runs, key=lambda run: run["seconds"])
+
+
+def test_heavy_dependencies_are_imported_lazily(startup):
+    assert startup["loaded"] == []
+
+
+def test_import_time_within_budget(startup):
+    assert startup["seconds"] < IMPORT_BUDGET, (
+        f"import app took {startup['seconds']:.2f}s (budget {IMPORT_BUDGET}s); "
+        "profile with: python -X importtime -c 'import app'"
+    )
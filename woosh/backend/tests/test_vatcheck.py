@@ -0,0 +1,111 @@
+"""Tests for offline VAT number pre-validation."""
+
+import pytest
+from vatcheck import (
+    BAD_CHECKSUM,
+    BAD_FORMAT,
+    check_vat_number,
+    check_vat_numbers,
+    supported_countries,
+)
+
+# Well-formed numbers (published examples) for each country with a check digit
+VALID = [
+    ("AT", "U13585627"),
+    ("BE", "0428759497"),
+    ("DE", "136695976"),
+    ("DK", "13585628"),
+    ("EE", "100931558"),
+    ("EL", "094259216"),
+    ("ES", "B58378431"),
+    ("ES", "54362315K"),
+    ("ES", "X2482300W"),
+    ("FI", "20774740"),
+    ("FR", "40303265045"),
+    ("HR", "33392005961"),
+    ("HU", "12892312"),
+    ("IE", "6433435F"),
+    ("IE", "8D79739I"),
+    ("IE", "1234567TW"),
+    ("IT", "00743110157"),
+    ("LT", "119511515"),
+    ("LU", "15027442"),
+    ("LV", "40003521600"),
+    ("MT", "11679112"),
+    ("NL", "004495445B01"),
+    ("NL", "002455799B11"),
+    ("PL", "8567346215"),
+    ("PT", "501964843"),
+    ("RO", "18547290"),
+    ("SE", "123456789701"),
+    ("SI", "50223054"),
+    ("SK", "2022749619"),
+]
+
+
+@pytest.mark.parametrize("country,number", VALID)
+def test_valid_numbers_pass(country, number):
+    assert check_vat_number(country, number) is None
+
+
+# NL and SE numbers end in a suffix, not the check digit
+TYPO_CHECKED = [v for v in VALID if v[1][-1].isdigit() and v[0] not in ("NL", "SE")]
+
+
+@pytest.mark.parametrize("country,number", TYPO_CHECKED)
+def test_typo_in_check_digit_is_caught(country, number):
+    typo = number[:-1] + str((int(number[-1]) + 1) % 10)
+    assert check_vat_number(country, typo) == BAD_CHECKSUM
+
+
+@pytest.mark.parametrize(
+    "country,number",
+    [
+        ("IT", "1234567890"),
+        ("DE", "12345678A"),
+        ("AT", "13585627"),
+        ("NL", "004495445"),
+    ],
+)
+def test_malformed_numbers_are_rejected(country, number):
+    assert check_vat_number(country, number) == BAD_FORMAT
+
+
+def test_spanish_letter_check():
+    assert check_vat_number("ES", "54362315Z") == BAD_CHECKSUM
+
+
+def test_portuguese_check_digit_zero():
+    # Weighted sum is a multiple of 11, so the check digit is 0, not 1
+    assert check_vat_number("PT", "783645120") is None
+    assert check_vat_number("PT", "783645121") == BAD_CHECKSUM
+
+
+def test_italian_zero_company_number_is_rejected():
+    assert check_vat_number("IT", "00000000000") == BAD_CHECKSUM
+
+
+def test_alphanumeric_french_key_is_accepted():
+    assert check_vat_number("FR", "K7399859412") is None
+
+
+def test_unknown_country_is_passed_through():
+    assert check_vat_number("GR", "anything") is None
+
+
+def test_bulk_check_returns_only_rejections():
+    numbers = [
+        ("IT", "00743110157"),
+        ("IT", "00743110158"),
+        ("IT", "00743110158"),
+        ("DE", "1"),
+    ]
+
+    assert check_vat_numbers(numbers) == {
+        ("IT", "00743110158"): BAD_CHECKSUM,
+        ("DE", "1"): BAD_FORMAT,
+    }
+
+
+def test_every_eu_member_state_has_a_rule():
+    assert len(supported_countries()) == 28
@@ -1,6 +1,47 @@
 """Tests for VIES VAT validation module."""
 
-from vies import parse_vat_input
+import asyncio
+import threading
+from datetime import date
+from types import SimpleNamespace
+
+import vies
+from cache import create_cache
+from ratelimit import KeyedRateLimiter
+from vatcheck import _mod_11_10_check
+from vies import _AsyncVIESClient, parse_vat_input, validate_vat_async
+from zeep.exceptions import Fault
+
+
+class FakeAsyncService:
+    """Stands in for zeep's async service proxy."""
+
+    def __init__(self, fault: bool = False):
+        self.fault = fault
+        self.calls = []
+
+    async def checkVat(self, countryCode: str, vatNumber: str):
+        self.calls.append((countryCode, vatNumber))
+        if self.fault:
+            raise Fault("MS_UNAVAILABLE")
+        return SimpleNamespace(
+            requestDate=date(2024, 1, 31),
+            valid=True,
+            name="ACME SRL",
+            address="VIA ROMA 1",
+        )
+
+
+def _german_vat(n: int) -> str:
+    """A distinct, well-formed German VAT number for each ``n``."""
+    body = f"{n:08d}"
+    return f"DE{body}{_mod_11_10_check(body)}"
+
+
+def _fake_async_client(service: FakeAsyncService) -> _AsyncVIESClient:
+    client = _AsyncVIESClient.__new__(_AsyncVIESClient)
+    client.client = SimpleNamespace(service=service)
+    return client
 
 
 class TestParseVatInput:
@@ -42,3 +83,271 @@ class TestParseVatInput:
             country, vat = parse_vat_input(vat_input)
             assert country == expected_country
             assert vat == expected_vat
+
+
+class TestValidateVatAsync:
+    """Tests for the async VIES client path."""
+
+    def test_valid_response(self, monkeypatch):
+        service = FakeAsyncService()
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+
+        result = asyncio.run(validate_vat_async("it 12345678903"))
+
+        assert service.calls == [("IT", "12345678903")]
+        assert result.is_valid
+        assert result.company_name == "ACME SRL"
+        assert result.request_date == "2024-01-31"
+
+    def test_fault_becomes_error_info(self, monkeypatch):
+        service = FakeAsyncService(fault=True)
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+
+        result = asyncio.run(validate_vat_async("DE123456788"))
+
+        assert not result.is_valid
+        assert result.error_message == "VIES Error: MS_UNAVAILABLE"
+
+
+class TestLocalCheck:
+    """Tests for rejecting malformed numbers without calling VIES."""
+
+    def test_bad_check_digit_skips_vies(self, monkeypatch):
+        service = FakeAsyncService()
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+
+        result = asyncio.run(validate_vat_async("IT12345678901"))
+
+        assert service.calls == []
+        assert not result.is_valid
+        assert result.error_message == "Invalid VAT number: check digit mismatch"
+
+    def test_rejections_are_not_cached(self, monkeypatch):
+        service = FakeAsyncService()
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+
+        asyncio.run(validate_vat_async("DE123"))
+
+        assert vies.vat_cache_stats()["entries"] == 0
+
+    def test_can_be_disabled(self, monkeypatch):
+        monkeypatch.setattr(vies, "VAT_LOCAL_CHECK", False)
+        service = FakeAsyncService()
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+
+        asyncio.run(validate_vat_async("IT12345678901"))
+
+        assert service.calls == [("IT", "12345678901")]
+
+
+class TestVatCache:
+    """Tests for the VIES result cache."""
+
+    def test_repeat_lookup_is_served_from_cache(self, monkeypatch):
+        service = FakeAsyncService()
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+
+        first = asyncio.run(validate_vat_async("IT12345678903"))
+        second = asyncio.run(validate_vat_async("it 12345678903"))
+
+        assert service.calls == [("IT", "12345678903")]
+        assert second == first
+        stats = vies.vat_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_error_results_use_short_ttl(self, monkeypatch):
+        monkeypatch.setattr(vies, "VAT_CACHE_TTL_ERROR", 0)
+        monkeypatch.setattr(vies, "VIES_RETRIES", 0)
+        service = FakeAsyncService(fault=True)
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+
+        asyncio.run(validate_vat_async("IT12345678903"))
+        asyncio.run(validate_vat_async("IT12345678903"))
+
+        assert len(service.calls) == 2
+
+    def test_sqlite_store_is_used_off_the_event_loop(self, monkeypatch, tmp_path):
+        cache = create_cache("sqlite", table="vat", path=str(tmp_path / "vat.db"))
+        monkeypatch.setattr(vies, "_vat_cache", cache)
+        service = FakeAsyncService()
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+        threads = []
+        for name in ("get_entry", "set_entry"):
+            method = getattr(cache.store, name)
+
+            def recording(*args, method=method):
+                threads.append(threading.current_thread())
+                return method(*args)
+
+            monkeypatch.setattr(cache.store, name, recording)
+
+        # asyncio.run waits for the background store write on the default pool
+        info = asyncio.run(validate_vat_async("IT12345678903"))
+        cache.memory.clear()
+
+        assert asyncio.run(validate_vat_async("IT12345678903")) == info
+        assert service.calls == [("IT", "12345678903")]
+        assert len(threads) == 3
+        assert threading.main_thread() not in threads
+
+    def test_ttl_depends_on_outcome(self):
+        valid = vies.VATInfo(country_code="IT", vat_number="1", is_valid=True)
+        invalid = vies.VATInfo(country_code="IT", vat_number="1", is_valid=False)
+        error = vies.VATInfo(
+            country_code="IT", vat_number="1", is_valid=False, error_message="x"
+        )
+
+        assert vies._cache_ttl(valid) == vies.VAT_CACHE_TTL_VALID
+        assert vies._cache_ttl(invalid) == vies.VAT_CACHE_TTL_INVALID
+        assert vies._cache_ttl(error) == vies.VAT_CACHE_TTL_ERROR
+
+
+class SlowAsyncService(FakeAsyncService):
+    async def checkVat(self, countryCode: str, vatNumber: str):
+        await asyncio.sleep(0.05)
+        return await super().checkVat(countryCode, vatNumber)
+
+
+def test_concurrent_lookups_are_coalesced(monkeypatch):
+    service = SlowAsyncService()
+    monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+
+    async def run_all():
+        return await asyncio.gather(
+            *(validate_vat_async("IT12345678903") for _ in range(10))
+        )
+
+    results = asyncio.run(run_all())
+
+    assert service.calls == [("IT", "12345678903")]
+    assert len({r.model_dump_json() for r in results}) == 1
+
+
+def test_abandoned_batch_does_not_drain_country_bucket(monkeypatch):
+    service = FakeAsyncService()
+    monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+    limiter = KeyedRateLimiter(rate=1, capacity=1)
+    monkeypatch.setattr(vies, "_country_limiter", limiter)
+
+    async def read_one():
+        batch = vies.validate_vat_batch(
+            [_german_vat(n) for n in range(200)], concurrency=4
+        )
+        await batch.__anext__()
+        await batch.aclose()
+
+    asyncio.run(read_one())
+
+    # At most the batch's own in-flight reservations, none left in debt
+    assert limiter.bucket("DE").wait_time() <= 1
+
+
+class FlakyAsyncService(FakeAsyncService):
+    """Raises the given faults in order, then answers normally."""
+
+    def __init__(self, *faults: str):
+        super().__init__()
+        self.faults = list(faults)
+
+    async def checkVat(self, countryCode: str, vatNumber: str):
+        if self.faults:
+            self.calls.append((countryCode, vatNumber))
+            raise Fault(self.faults.pop(0))
+        return await super().checkVat(countryCode, vatNumber)
+
+
+class TestRetriesAndCircuitBreaker:
+    """Tests for transient fault handling."""
+
+    def test_transient_faults_are_retried(self, monkeypatch):
+        service = FlakyAsyncService("MS_UNAVAILABLE", "TIMEOUT")
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+
+        result = asyncio.run(validate_vat_async("DE123456788"))
+
+        assert result.is_valid
+        assert len(service.calls) == 3
+
+    def test_invalid_input_is_not_retried(self, monkeypatch):
+        service = FlakyAsyncService("INVALID_INPUT")
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+
+        result = asyncio.run(validate_vat_async("DE123456788"))
+
+        assert result.error_message == "VIES Error: INVALID_INPUT"
+        assert len(service.calls) == 1
+
+    def test_failing_country_fails_fast(self, monkeypatch):
+        monkeypatch.setattr(vies, "VAT_CACHE_TTL_ERROR", 0)
+        service = FakeAsyncService(fault=True)
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+
+        async def lookups():
+            for n in range(vies.VIES_BREAKER_THRESHOLD + 2):
+                await validate_vat_async(_german_vat(n))
+            return await validate_vat_async("IT12345678903")
+
+        italian = asyncio.run(lookups())
+
+        attempts = vies.VIES_RETRIES + 1
+        assert len(service.calls) == (vies.VIES_BREAKER_THRESHOLD + 1) * attempts
+        assert vies._country_breakers.states()["DE"] == "open"
+        # Other member states are unaffected
+        assert italian.error_message == "VIES Error: MS_UNAVAILABLE"
+
+    def test_open_circuit_result_explains_the_outage(self, monkeypatch):
+        breaker = vies._country_breakers.breaker("FR")
+        for _ in range(vies.VIES_BREAKER_THRESHOLD):
+            breaker.record_failure()
+        service = FakeAsyncService()
+        monkeypatch.setattr(vies, "_async_vies_client", _fake_async_client(service))
+
+        result = asyncio.run(validate_vat_async("FR32123456789"))
+
+        assert service.calls == []
+        assert result.error_message.startswith("VIES Error: MS_UNAVAILABLE (FR")
+
+
+class TestWarmUp:
+    """Tests for offline WSDL loading and client warm-up."""
+
+    def test_vendored_wsdl_builds_client_offline(self, monkeypatch):
+        monkeypatch.setattr(vies, "_async_vies_client", None)
+
+        async def warm_up():
+            try:
+                return await vies.warm_up_async_client()
+            finally:
+                await vies.close_async_client()
+
+        assert asyncio.run(warm_up()) is True
+
+    def test_vendored_wsdl_targets_vies_endpoint(self):
+        client = _AsyncVIESClient()
+        try:
+            assert client.client.service._binding_options["address"] == (
+                "https://ec.europa.eu/taxation_customs/vies/services/checkVatService"
+            )
+        finally:
+            asyncio.run(client.aclose())
+
+    def test_failed_warm_up_is_reported(self, monkeypatch):
+        def unreachable():
+            raise OSError("WSDL host unreachable")
+
+        monkeypatch.setattr(vies, "_async_vies_client", None)
+        monkeypatch.setattr(vies, "_AsyncVIESClient", unreachable)
+
+        assert asyncio.run(vies.warm_up_async_client()) is False
+        assert not vies.async_client_ready()
+
+    def test_failed_preload_leaves_warm_up_to_workers(self, monkeypatch):
+        def unreachable():
+            raise OSError("WSDL host unreachable")
+
+        monkeypatch.setattr(vies, "_async_vies_client", None)
+        monkeypatch.setattr(vies, "_AsyncVIESClient", unreachable)
+
+        assert vies.preload_async_client() is False
+        assert not vies.async_client_ready()
@@ -0,0 +1,293 @@
+"""
+Offline VAT number pre-validation: per-country format and check digit rules.
+
+Malformed numbers and typos are rejected locally, without a VIES round trip.
+Only the structure is checked - a number that passes may still be unknown to
+VIES. Countries without a rule here are passed through unchanged.
+"""
+
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+
+# Rejection reasons, used in the VATInfo error message
+BAD_FORMAT = "wrong length or format"
+BAD_CHECKSUM = "check digit mismatch"
+
+
+def _digits(number: str) -> List[int]:
+    return [int(c) for c in number]
+
+
+def _weighted(number: str, weights: Iterable[int]) -> int:
+    return sum(d * w for d, w in zip(_digits(number), weights))
+
+
+def _luhn_ok(number: str) -> bool:
+    """Luhn (mod 10) check over the whole number, check digit last."""
+    total = 0
+    for i, d in enumerate(reversed(_digits(number))):
+        if i % 2:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return total % 10 == 0
+
+
+def _mod_11_10_check(number: str) -> int:
+    """ISO 7064 Mod 11,10 check digit for ``number`` (DE, HR)."""
+    product = 10
+    for d in _digits(number):
+        total = (d + product) % 10 or 10
+        product = (2 * total) % 11
+    return (11 - product) % 10
+
+
+# =============================================================================
+# PER-COUNTRY CHECK DIGIT ALGORITHMS (input already matches the format)
+# =============================================================================
+
+
+def _check_at(n: str) -> bool:
+    # U + 8 digits; Luhn-like over the 7 digits, offset by 4
+    total = 0
+    for i, d in enumerate(_digits(n[1:8])):
+        if i % 2:
+            d = d * 2 // 10 + d * 2 % 10
+        total += d
+    return (10 - (total + 4) % 10) % 10 == int(n[8])
+
+
+def _check_be(n: str) -> bool:
+    return 97 - int(n[:8]) % 97 == int(n[8:])
+
+
+def _check_de(n: str) -> bool:
+    return _mod_11_10_check(n[:8]) == int(n[8])
+
+
+def _check_dk(n: str) -> bool:
+    return _weighted(n, (2, 7, 6, 5, 4, 3, 2, 1)) % 11 == 0
+
+
+def _check_ee(n: str) -> bool:
+    return _weighted(n, (3, 7, 1, 3, 7, 1, 3, 7, 1)) % 10 == 0
+
+
+def _check_el(n: str) -> bool:
+    return _weighted(n[:8], (256, 128, 64, 32, 16, 8, 4, 2)) % 11 % 10 == int(n[8])
+
+
+_ES_LETTERS = "TRWAGMYFPDXBNJZSQVHLCKE"
+
+
+def _check_es(n: str) -> bool:
+    if n[0].isdigit():
+        # DNI (resident individuals)
+        return _ES_LETTERS[int(n[:8]) % 23] == n[8]
+    if n[0] in "XYZ":
+        # NIE (foreign individuals)
+        return _ES_LETTERS[int(str("XYZ".index(n[0])) + n[1:8]) % 23] == n[8]
+    if n[0] in "KLM":
+        # Other individuals: DNI letter over the 7 digits
+        return _ES_LETTERS[int(n[1:8]) % 23] == n[8]
+    # CIF (legal entities): Luhn-like over the 7 digits, digit or letter check
+    total = 0
+    for i, d in enumerate(_digits(n[1:8])):
+        total += d if i % 2 else d * 2 // 10 + d * 2 % 10
+    check = (10 - total % 10) % 10
+    return n[8] in (str(check), "JABCDEFGHI"[check])
+
+
+def _check_fi(n: str) -> bool:
+    return _weighted(n, (7, 9, 10, 5, 8, 4, 2, 1)) % 11 == 0
+
+
+def _check_fr(n: str) -> bool:
+    # Numeric keys derive from the SIREN; alphanumeric (newer) keys can't be
+    # checked offline
+    if not n[:2].isdigit():
+        return True
+    return int(n[:2]) == (12 + 3 * (int(n[2:]) % 97)) % 97
+
+
+def _check_hr(n: str) -> bool:
+    return _mod_11_10_check(n[:10]) == int(n[10])
+
+
+def _check_hu(n: str) -> bool:
+    return _weighted(n, (9, 7, 3, 1, 9, 7, 3, 1)) % 10 == 0
+
+
+_IE_LETTERS = "WABCDEFGHIJKLMNOPQRSTUV"
+
+
+def _check_ie(n: str) -> bool:
+    if not n[1].isdigit():
+        # Old format: digit, letter/+/*, 5 digits, check letter
+        n = "0" + n[2:7] + n[0] + n[7]
+    total = _weighted(n[:7], (8, 7, 6, 5, 4, 3, 2))
+    if len(n) == 9:
+        total += 9 * "WABCDEFGHI".index(n[8])
+    return _IE_LETTERS[total % 23] == n[7]
+
+
+def _check_it(n: str) -> bool:
+    # Partita IVA: Luhn, with a non-zero company number
+    return n[:7] != "0000000" and _luhn_ok(n)
+
+
+def _check_lt(n: str) -> bool:
+    body = _digits(n[:-1])
+    total = sum(d * (1 + i % 9) for i, d in enumerate(body)) % 11
+    if total == 10:
+        total = sum(d * (1 + (i + 2) % 9) for i, d in enumerate(body)) % 11
+    return total % 10 == int(n[-1])
+
+
+def _check_lu(n: str) -> bool:
+    return int(n[:6]) % 89 == int(n[6:])
+
+
+def _check_lv(n: str) -> bool:
+    if n[0] <= "3":
+        # Personal codes: no reliable check digit since 2017
+        return True
+    return _weighted(n, (9, 1, 4, 8, 3, 10, 2, 5, 7, 6, 1)) % 11 == 3
+
+
+def _check_mt(n: str) -> bool:
+    return _weighted(n, (3, 4, 6, 7, 8, 9, 10, 1)) % 37 == 0
+
+
+def _check_nl(n: str) -> bool:
+    # Legal entities: mod 11 over the first 9 digits. Sole proprietors (since
+    # 2020): ISO 7064 mod 97 over "NL" + number, letters as N=23 L=21 B=11
+    if (_weighted(n[:8], range(9, 1, -1)) - int(n[8])) % 11 == 0:
+        return True
+    return int("2321" + n[:9] + "11" + n[10:]) % 97 == 1
+
+
+def _check_pl(n: str) -> bool:
+    return _weighted(n[:9], (6, 5, 7, 2, 3, 4, 5, 6, 7)) % 11 == int(n[9])
+
+
+def _check_pt(n: str) -> bool:
+    # 10 and 11 both map to 0
+    check = 11 - _weighted(n[:8], range(9, 1, -1)) % 11
+    check = 0 if check >= 10 else check
+    return check == int(n[8])
+
+
+def _check_ro(n: str) -> bool:
+    body = n[:-1].zfill(9)
+    return _weighted(body, (7, 5, 3, 2, 1, 7, 5, 3, 2)) * 10 % 11 % 10 == int(n[-1])
+
+
+def _check_se(n: str) -> bool:
+    # Organisation number (Luhn) followed by a two-digit suffix
+    return _luhn_ok(n[:10])
+
+
+def _check_si(n: str) -> bool:
+    check = 11 - _weighted(n[:7], (8, 7, 6, 5, 4, 3, 2)) % 11
+    return check != 11 and check % 10 == int(n[7])
+
+
+def _check_sk(n: str) -> bool:
+    return int(n) % 11 == 0
+
+
+# Country code -> (full-match format, check digit function or None)
+_RULES: Dict[str, Tuple[str, Optional[Callable[[str], bool]]]] = {
+    "AT": (r"U\d{8}", _check_at),
+    "BE": (r"[01]\d{9}", _check_be),
+    "BG": (r"\d{9,10}", None),
+    "CY": (r"\d{8}[A-Z]", None),
+    "CZ": (r"\d{8,10}", None),
+    "DE": (r"\d{9}", _check_de),
+    "DK": (r"\d{8}", _check_dk),
+    "EE": (r"\d{9}", _check_ee),
+    "EL": (r"\d{9}", _check_el),
+    "ES": (r"[\dA-HJ-NP-SUVWXYZ]\d{7}[\dA-Z]", _check_es),
+    "FI": (r"\d{8}", _check_fi),
+    "FR": (r"[\dA-HJ-NP-Z]{2}\d{9}", _check_fr),
+    "HR": (r"\d{11}", _check_hr),
+    "HU": (r"\d{8}", _check_hu),
+    "IE": (r"\d{7}[A-W][A-IW]?|\d[A-Z+*]\d{5}[A-W]", _check_ie),
+    "IT": (r"\d{11}", _check_it),
+    "LT": (r"\d{9}|\d{12}", _check_lt),
+    "LU": (r"\d{8}", _check_lu),
+    "LV": (r"\d{11}", _check_lv),
+    "MT": (r"\d{8}", _check_mt),
+    "NL": (r"\d{9}B\d{2}", _check_nl),
+    "PL": (r"\d{10}", _check_pl),
+    "PT": (r"\d{9}", _check_pt),
+    "RO": (r"\d{2,10}", _check_ro),
+    "SE": (r"\d{12}", _check_se),
+    "SI": (r"\d{8}", _check_si),
+    "SK": (r"\d{10}", _check_sk),
+    "XI": (r"\d{9}|\d{12}|GD\d{3}|HA\d{3}", None),
+}
+
+_COMPILED: Dict[str, Tuple[Pattern[str], Optional[Callable[[str], bool]]]] = {
+    country: (re.compile(pattern), check)
+    for country, (pattern, check) in _RULES.items()
+}
+
+
+def check_vat_number(country_code: str, vat_number: str) -> Optional[str]:
+    """
+    Check a VAT number's format and check digit without calling VIES.
+
+    Args:
+        country_code: Two-letter VIES country code (uppercase, e.g. 'EL' for Greece)
+        vat_number: VAT number without country code (uppercase, no spaces)
+
+    Returns:
+        None if the number may be valid (or the country has no rule), else
+        the reason it is rejected
+
+    Example:
+        >>> check_vat_number("IT", "00743110157") is None
+        True
+        >>> check_vat_number("IT", "00743110158")
+        'check digit mismatch'
+    """
+    rule = _COMPILED.get(country_code)
+    if rule is None:
+        return None
+    pattern, check = rule
+    if not pattern.fullmatch(vat_number):
+        return BAD_FORMAT
+    if check is not None and not check(vat_number):
+        return BAD_CHECKSUM
+    return None
+
+
+def check_vat_numbers(
+    numbers: Iterable[Tuple[str, str]],
+) -> Dict[Tuple[str, str], str]:
+    """
+    Pre-screen many (country_code, vat_number) pairs in one pass.
+
+    Each distinct pair is checked once and countries without a rule are
+    skipped up front, so screening a large batch costs little next to a
+    single VIES call.
+
+    Returns:
+        The rejected pairs, mapped to the reason; pairs not in the result
+        may be valid
+    """
+    rejected = {}
+    for key in dict.fromkeys(numbers):
+        if key[0] in _COMPILED:
+            reason = check_vat_number(*key)
+            if reason is not None:
+                rejected[key] = reason
+    return rejected
+
+
+def supported_countries() -> List[str]:
+    """Country codes with a local format rule."""
+    return sorted(_RULES)
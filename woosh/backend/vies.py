@@ -27,11 +27,66 @@ r"""VIES (VAT Information Exchange System) integration for EU VAT validation.
         /_!/            >_\<
 """
 
-from typing import Any, Optional
+import asyncio
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+)
 
+from cache import create_cache
+from circuitbreaker import KeyedCircuitBreaker
+from config import (
+    VAT_CACHE_MAX_ENTRIES,
+    VAT_CACHE_PATH,
+    VAT_CACHE_TTL_ERROR,
+    VAT_CACHE_TTL_INVALID,
+    VAT_CACHE_TTL_VALID,
+    VAT_LOCAL_CHECK,
+    VIES_BATCH_CONCURRENCY,
+    VIES_BREAKER_COOLDOWN,
+    VIES_BREAKER_THRESHOLD,
+    VIES_COUNTRY_RATE,
+    VIES_MAX_CONNECTIONS,
+    VIES_RETRIES,
+    VIES_RETRY_BACKOFF,
+    VIES_TIMEOUT,
+    VIES_WSDL,
+    VIES_WSDL_CACHE_PATH,
+    VIES_WSDL_CACHE_TTL,
+)
+from metrics import (
+    CIRCUIT_REJECTIONS,
+    STAGE_SECONDS,
+    UPSTREAM_ERRORS,
+    UPSTREAM_INFLIGHT,
+    UPSTREAM_RETRIES,
+    VAT_LOCAL_REJECTIONS,
+    error_type,
+    register_cache,
+    register_flight,
+)
 from pydantic import BaseModel
-from zeep import Client
-from zeep.exceptions import Fault
+from ratelimit import KeyedRateLimiter
+from singleflight import AsyncSingleFlight, SingleFlight
+from vatcheck import check_vat_number, check_vat_numbers
+
+# zeep (with lxml) and httpx are imported where first needed: they dominate
+# this module's import time, and a process may never build a VIES client
+if TYPE_CHECKING:
+    from zeep.cache import SqliteCache
+
+logger = logging.getLogger(__name__)
 
 
 class VATInfo(BaseModel):
@@ -46,19 +101,217 @@ class VATInfo(BaseModel):
     error_message: Optional[str] = None
 
 
+def _response_to_info(country_code: str, vat_number: str, response: Any) -> VATInfo:
+    """Build a VATInfo from a checkVat SOAP response."""
+    # Extract data from SOAP response (zeep returns dynamic objects)
+    # Response attributes: requestDate (datetime), valid (bool), name (str), address (str)
+    request_date: str = response.requestDate.isoformat()  # type: ignore[attr-defined]
+    is_valid: bool = response.valid  # type: ignore[attr-defined]
+    company_name: Optional[str] = response.name or None  # type: ignore[attr-defined]
+    company_address: Optional[str] = response.address or None  # type: ignore[attr-defined]
+
+    return VATInfo(
+        country_code=country_code,
+        vat_number=vat_number,
+        is_valid=is_valid,
+        company_name=company_name,
+        company_address=company_address,
+        request_date=request_date,
+        error_message=None,
+    )
+
+
+def _error_info(country_code: str, vat_number: str, message: str) -> VATInfo:
+    """Build a VATInfo describing a failed lookup."""
+    return VATInfo(
+        country_code=country_code,
+        vat_number=vat_number,
+        is_valid=False,
+        error_message=message,
+    )
+
+
+def _rejected_info(country_code: str, vat_number: str, reason: str) -> VATInfo:
+    """Build a VATInfo for a number that failed the offline format check."""
+    VAT_LOCAL_REJECTIONS.inc(country=country_code)
+    return _error_info(country_code, vat_number, f"Invalid VAT number: {reason}")
+
+
+def precheck_vat(country_code: str, vat_number: str) -> Optional[VATInfo]:
+    """
+    Reject a malformed number locally, without calling VIES.
+
+    Args:
+        country_code: Two-letter country code, as returned by :func:`parse_vat_input`
+        vat_number: VAT number without country code
+
+    Returns:
+        The rejection as an invalid VATInfo, or None if the number should go
+        to VIES (or local checks are disabled)
+    """
+    if not VAT_LOCAL_CHECK:
+        return None
+    reason = check_vat_number(country_code, vat_number)
+    if reason is None:
+        return None
+    return _rejected_info(country_code, vat_number, reason)
+
+
+@contextmanager
+def _timed_call() -> Iterator[None]:
+    """Time one VIES call and count its failures by type."""
+    with STAGE_SECONDS.time(stage="vies_call"), UPSTREAM_INFLIGHT.track_inprogress(
+        service="vies"
+    ):
+        try:
+            yield
+        except Exception as e:
+            UPSTREAM_ERRORS.inc(service="vies", type=error_type(e))
+            raise
+
+
+# Faults VIES returns while a member state (or VIES itself) is briefly down
+_TRANSIENT_FAULTS = frozenset(
+    {
+        "MS_UNAVAILABLE",
+        "TIMEOUT",
+        "SERVICE_UNAVAILABLE",
+        "MS_MAX_CONCURRENT_REQ",
+        "GLOBAL_MAX_CONCURRENT_REQ",
+    }
+)
+
+# Member states that keep failing are failed fast for a while, then probed
+_country_breakers = KeyedCircuitBreaker(VIES_BREAKER_THRESHOLD, VIES_BREAKER_COOLDOWN)
+
+
+def _failure_info(
+    country_code: str, vat_number: str, error: Exception
+) -> Tuple[VATInfo, bool]:
+    """Error VATInfo for a failed call, and whether the failure is transient."""
+    from zeep.exceptions import Fault
+
+    if isinstance(error, Fault):
+        message = f"VIES Error: {str(error)}"
+        transient = (error.message or "").strip() in _TRANSIENT_FAULTS
+        return _error_info(country_code, vat_number, message), transient
+    message = f"Connection Error: {str(error)}"
+    return _error_info(country_code, vat_number, message), True
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter, so retries don't arrive in waves."""
+    UPSTREAM_RETRIES.inc(service="vies")
+    return random.uniform(0, VIES_RETRY_BACKOFF * 2**attempt)
+
+
+def _circuit_open_info(country_code: str, vat_number: str) -> VATInfo:
+    CIRCUIT_REJECTIONS.inc(service="vies", key=country_code)
+    retry_after = _country_breakers.breaker(country_code).retry_after()
+    return _error_info(
+        country_code,
+        vat_number,
+        f"VIES Error: MS_UNAVAILABLE ({country_code} is failing, "
+        f"retrying in {retry_after:.0f}s)",
+    )
+
+
+def _wsdl_cache() -> "Optional[SqliteCache]":
+    """zeep cache for a remote WSDL (the vendored file needs none)."""
+    if not VIES_WSDL.startswith(("http://", "https://")):
+        return None
+    from zeep.cache import SqliteCache
+
+    directory = os.path.dirname(VIES_WSDL_CACHE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return SqliteCache(path=VIES_WSDL_CACHE_PATH, timeout=VIES_WSDL_CACHE_TTL)
+
+
 class _VIESClient:
     """Internal SOAP client for VIES service (not meant for direct use)."""
 
-    VIES_WSDL_URL = "https://ec.europa.eu/taxation_customs/vies/checkVatService.wsdl"
-
     def __init__(self):
         """Initialize the VIES SOAP client."""
-        self.client = Client(self.VIES_WSDL_URL)
+        from zeep import Client
+        from zeep.transports import Transport
+
+        self.client = Client(VIES_WSDL, transport=Transport(cache=_wsdl_cache()))
 
     def _call_service(self, country_code: str, vat_number: str) -> VATInfo:
         """
         Internal method: Call VIES service with pre-cleaned inputs.
 
+        Transient faults are retried with jittered backoff, and lookups for a
+        member state whose circuit is open fail fast without calling VIES.
+
+        Args:
+            country_code: Two-letter country code (uppercase)
+            vat_number: VAT number without country code (uppercase, no spaces)
+
+        Returns:
+            VATInfo object with validation results
+        """
+        from zeep.exceptions import Fault
+
+        breaker = _country_breakers.breaker(country_code)
+        if not breaker.allow():
+            return _circuit_open_info(country_code, vat_number)
+
+        for attempt in range(VIES_RETRIES + 1):
+            try:
+                with _timed_call():
+                    # Call VIES service directly with cleaned inputs
+                    response: Any = self.client.service.checkVat(
+                        countryCode=country_code, vatNumber=vat_number
+                    )
+            except (Fault, OSError, ConnectionError, TimeoutError) as e:
+                info, transient = _failure_info(country_code, vat_number, e)
+                if not transient:
+                    # The member state answered (e.g. INVALID_INPUT)
+                    breaker.record_success()
+                    return info
+                if attempt < VIES_RETRIES:
+                    time.sleep(_retry_delay(attempt))
+            else:
+                breaker.record_success()
+                return _response_to_info(country_code, vat_number, response)
+
+        breaker.record_failure()
+        return info
+
+
+class _AsyncVIESClient:
+    """Internal async SOAP client for VIES over a pooled keep-alive connection.
+
+    All calls share one httpx connection pool, so concurrent lookups reuse
+    TLS connections to VIES instead of opening one per request.
+    """
+
+    def __init__(self):
+        """Initialize the client (parses the WSDL synchronously)."""
+        import httpx
+        from zeep import AsyncClient
+        from zeep.transports import AsyncTransport
+
+        self._http = httpx.AsyncClient(
+            timeout=VIES_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=VIES_MAX_CONNECTIONS,
+                max_keepalive_connections=VIES_MAX_CONNECTIONS,
+            ),
+        )
+        self.client = AsyncClient(
+            VIES_WSDL, transport=AsyncTransport(client=self._http, cache=_wsdl_cache())
+        )
+
+    async def _call_service(self, country_code: str, vat_number: str) -> VATInfo:
+        """
+        Internal method: Call VIES service with pre-cleaned inputs.
+
+        Transient faults are retried with jittered backoff, and lookups for a
+        member state whose circuit is open fail fast without calling VIES.
+
         Args:
             country_code: Two-letter country code (uppercase)
             vat_number: VAT number without country code (uppercase, no spaces)
@@ -66,42 +319,43 @@ class _VIESClient:
         Returns:
             VATInfo object with validation results
         """
-        try:
-            # Call VIES service directly with cleaned inputs
-            response: Any = self.client.service.checkVat(
-                countryCode=country_code, vatNumber=vat_number
-            )
-
-            # Extract data from SOAP response (zeep returns dynamic objects)
-            # Response attributes: requestDate (datetime), valid (bool), name (str), address (str)
-            request_date: str = response.requestDate.isoformat()  # type: ignore[attr-defined]
-            is_valid: bool = response.valid  # type: ignore[attr-defined]
-            company_name: Optional[str] = response.name or None  # type: ignore[attr-defined]
-            company_address: Optional[str] = response.address or None  # type: ignore[attr-defined]
-
-            return VATInfo(
-                country_code=country_code,
-                vat_number=vat_number,
-                is_valid=is_valid,
-                company_name=company_name,
-                company_address=company_address,
-                request_date=request_date,
-                error_message=None,
-            )
-        except Fault as e:
-            return VATInfo(
-                country_code=country_code,
-                vat_number=vat_number,
-                is_valid=False,
-                error_message=f"VIES Error: {str(e)}",
-            )
-        except (OSError, ConnectionError, TimeoutError) as e:
-            return VATInfo(
-                country_code=country_code,
-                vat_number=vat_number,
-                is_valid=False,
-                error_message=f"Connection Error: {str(e)}",
-            )
+        import httpx
+        from zeep.exceptions import Fault
+
+        breaker = _country_breakers.breaker(country_code)
+        if not breaker.allow():
+            return _circuit_open_info(country_code, vat_number)
+
+        for attempt in range(VIES_RETRIES + 1):
+            try:
+                with _timed_call():
+                    response: Any = await self.client.service.checkVat(
+                        countryCode=country_code, vatNumber=vat_number
+                    )
+            except (
+                Fault,
+                OSError,
+                ConnectionError,
+                TimeoutError,
+                httpx.TransportError,
+            ) as e:
+                info, transient = _failure_info(country_code, vat_number, e)
+                if not transient:
+                    # The member state answered (e.g. INVALID_INPUT)
+                    breaker.record_success()
+                    return info
+                if attempt < VIES_RETRIES:
+                    await asyncio.sleep(_retry_delay(attempt))
+            else:
+                breaker.record_success()
+                return _response_to_info(country_code, vat_number, response)
+
+        breaker.record_failure()
+        return info
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections."""
+        await self._http.aclose()
 
 
 def parse_vat_input(vat_input: str, default_country: str = "IT") -> tuple[str, str]:
@@ -148,6 +402,78 @@ def _get_client() -> _VIESClient:
     return _vies_client
 
 
+# Cache of VIES results keyed on the normalized (country_code, vat_number)
+_vat_cache = create_cache(
+    "sqlite" if VAT_CACHE_PATH else "memory",
+    table="vat",
+    max_entries=VAT_CACHE_MAX_ENTRIES,
+    path=VAT_CACHE_PATH,
+)
+
+
+def _cache_key(country_code: str, vat_number: str) -> str:
+    return f"{country_code}:{vat_number}"
+
+
+def _cache_ttl(info: VATInfo) -> float:
+    """Valid results are stable for long, errors (VIES outages) only briefly."""
+    if info.error_message:
+        return VAT_CACHE_TTL_ERROR
+    return VAT_CACHE_TTL_VALID if info.is_valid else VAT_CACHE_TTL_INVALID
+
+
+def _get_cached(country_code: str, vat_number: str) -> Optional[VATInfo]:
+    data = _vat_cache.get(_cache_key(country_code, vat_number))
+    if data is None:
+        return None
+    return VATInfo.model_validate_json(data)
+
+
+def _store(info: VATInfo) -> VATInfo:
+    _vat_cache.set(
+        _cache_key(info.country_code, info.vat_number),
+        info.model_dump_json().encode(),
+        _cache_ttl(info),
+    )
+    return info
+
+
+async def _get_cached_async(country_code: str, vat_number: str) -> Optional[VATInfo]:
+    """Like :func:`_get_cached`, reading the SQLite store (if any) off the loop.
+
+    With ``WOOSH_VAT_CACHE_PATH`` set, a read may wait on another worker's
+    write lock; that wait must not stall every request on this event loop.
+    """
+    data = await _vat_cache.get_async(_cache_key(country_code, vat_number))
+    if data is None:
+        return None
+    return VATInfo.model_validate_json(data)
+
+
+def _store_behind(info: VATInfo) -> VATInfo:
+    """Like :func:`_store`, writing the persistent store in the background."""
+    _vat_cache.set_behind(
+        _cache_key(info.country_code, info.vat_number),
+        info.model_dump_json().encode(),
+        _cache_ttl(info),
+    )
+    return info
+
+
+# Concurrent lookups of the same number share one VIES call
+_vat_flight = SingleFlight()
+_async_vat_flight = AsyncSingleFlight()
+
+register_cache("vat", _vat_cache)
+register_flight("vat", _vat_flight)
+register_flight("vat_async", _async_vat_flight)
+
+
+def vat_cache_stats() -> Dict[str, float]:
+    """Hit/miss counters of the VIES result cache."""
+    return {**_vat_cache.stats.as_dict(), "entries": len(_vat_cache.memory)}
+
+
 def validate_vat(vat_input: str, default_country: str = "IT") -> VATInfo:
     """
     Validate a VAT number using the VIES service.
@@ -157,7 +483,9 @@ def validate_vat(vat_input: str, default_country: str = "IT") -> VATInfo:
         default_country: Default country code if not specified in input (default: 'IT')
 
     Returns:
-        VATInfo object with validation results
+        VATInfo object with validation results (served from the result cache
+        when the same number was checked recently). Numbers with a wrong
+        format or check digit are rejected without calling VIES.
 
     Example:
         >>> result = validate_vat("IT12345678901")
@@ -167,5 +495,205 @@ def validate_vat(vat_input: str, default_country: str = "IT") -> VATInfo:
         ...     print(f"Error: {result.error_message}")
     """
     country_code, vat_number = parse_vat_input(vat_input, default_country)
-    client = _get_client()
-    return client._call_service(country_code, vat_number)
+    rejected = precheck_vat(country_code, vat_number)
+    if rejected is not None:
+        return rejected
+    cached = _get_cached(country_code, vat_number)
+    if cached is not None:
+        return cached
+    return _vat_flight.do(
+        _cache_key(country_code, vat_number), _lookup, country_code, vat_number
+    )
+
+
+def _lookup(country_code: str, vat_number: str) -> VATInfo:
+    return _store(_get_client()._call_service(country_code, vat_number))
+
+
+_async_vies_client: Optional[_AsyncVIESClient] = None
+
+
+async def _get_async_client() -> _AsyncVIESClient:
+    """Get or create the singleton async VIES client.
+
+    The WSDL is still fetched and parsed synchronously by zeep, so the first
+    construction runs in a worker thread instead of blocking the event loop.
+    """
+    global _async_vies_client
+    if _async_vies_client is None:
+        loop = asyncio.get_running_loop()
+        client = await loop.run_in_executor(None, _AsyncVIESClient)
+        if _async_vies_client is None:
+            _async_vies_client = client
+        else:
+            await client.aclose()
+    return _async_vies_client
+
+
+async def warm_up_async_client() -> bool:
+    """Parse the WSDL and build the async client ahead of the first lookup.
+
+    Returns:
+        True if the client is ready; on failure the next lookup retries
+    """
+    try:
+        with STAGE_SECONDS.time(stage="vies_warmup"):
+            await _get_async_client()
+    except Exception as e:
+        logger.warning(f"VIES client warm-up failed: {e}")
+        return False
+    return True
+
+
+def preload_async_client() -> bool:
+    """Build the async client outside any event loop, before workers fork.
+
+    A preforking server calls this in its master process (see
+    ``gunicorn.conf.py``), so every worker inherits the parsed WSDL instead of
+    parsing it again. No connection is opened until a worker's first lookup.
+
+    Returns:
+        True if the client is ready; on failure workers warm up on their own
+    """
+    global _async_vies_client
+    if _async_vies_client is None:
+        try:
+            _async_vies_client = _AsyncVIESClient()
+        except Exception as e:
+            logger.warning(f"VIES client preload failed: {e}")
+            return False
+    return True
+
+
+def async_client_ready() -> bool:
+    """Whether the async VIES client is built and can serve lookups."""
+    return _async_vies_client is not None
+
+
+async def close_async_client() -> None:
+    """Close the async VIES client's connection pool, if one was created."""
+    global _async_vies_client
+    if _async_vies_client is not None:
+        await _async_vies_client.aclose()
+        _async_vies_client = None
+
+
+async def validate_vat_async(vat_input: str, default_country: str = "IT") -> VATInfo:
+    """
+    Validate a VAT number using the VIES service without blocking a thread.
+
+    Same contract as :func:`validate_vat`, but the SOAP call is awaited over
+    the shared connection pool.
+
+    Args:
+        vat_input: VAT number with or without country code (e.g., 'IT12345678901' or '12345678901')
+        default_country: Default country code if not specified in input (default: 'IT')
+
+    Returns:
+        VATInfo object with validation results
+    """
+    country_code, vat_number = parse_vat_input(vat_input, default_country)
+    rejected = precheck_vat(country_code, vat_number)
+    if rejected is not None:
+        return rejected
+    cached = await _get_cached_async(country_code, vat_number)
+    if cached is not None:
+        return cached
+    return await _async_vat_flight.do(
+        _cache_key(country_code, vat_number), _lookup_async, country_code, vat_number
+    )
+
+
+async def validate_vat_json_async(vat_input: str, default_country: str = "IT") -> bytes:
+    """
+    Like :func:`validate_vat_async`, returning the VATInfo encoded as JSON.
+
+    Cache entries are stored encoded, so a hit is returned as is, without
+    building and re-serializing a VATInfo.
+    """
+    country_code, vat_number = parse_vat_input(vat_input, default_country)
+    rejected = precheck_vat(country_code, vat_number)
+    if rejected is not None:
+        return rejected.model_dump_json().encode()
+    cached = await _vat_cache.get_async(_cache_key(country_code, vat_number))
+    if cached is not None:
+        return cached
+    info = await _async_vat_flight.do(
+        _cache_key(country_code, vat_number), _lookup_async, country_code, vat_number
+    )
+    return info.model_dump_json().encode()
+
+
+async def _lookup_async(country_code: str, vat_number: str) -> VATInfo:
+    client = await _get_async_client()
+    return _store_behind(await client._call_service(country_code, vat_number))
+
+
+# Shared by every batch so concurrent batches can't overrun a member state
+_country_limiter = KeyedRateLimiter(VIES_COUNTRY_RATE)
+
+
+async def validate_vat_batch(
+    vat_inputs: Iterable[str],
+    default_country: str = "IT",
+    concurrency: int = VIES_BATCH_CONCURRENCY,
+) -> AsyncIterator[VATInfo]:
+    """
+    Validate many VAT numbers concurrently, yielding results as they complete.
+
+    Inputs are deduplicated after :func:`parse_vat_input` normalization, so
+    'IT 123' and 'it123' cost one VIES call. Numbers failing the offline
+    format check are yielded first, without a VIES call. Each member state
+    is throttled by a shared per-country rate limit, and failures are
+    reported per item as a VATInfo with ``error_message`` instead of
+    aborting the batch.
+
+    Args:
+        vat_inputs: VAT numbers with or without country code
+        default_country: Default country code if not specified in input (default: 'IT')
+        concurrency: Maximum VIES calls in flight for this batch
+
+    Yields:
+        One VATInfo per distinct VAT number, in completion order
+    """
+    keys = dict.fromkeys(
+        parse_vat_input(vat_input, default_country)
+        for vat_input in vat_inputs
+        if vat_input.strip()
+    )
+    # Typos are answered up front and never reach the limiter or VIES
+    rejected = check_vat_numbers(keys) if VAT_LOCAL_CHECK else {}
+    for key, reason in rejected.items():
+        yield _rejected_info(*key, reason)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def check(country_code: str, vat_number: str) -> VATInfo:
+        cached = await _get_cached_async(country_code, vat_number)
+        if cached is not None:
+            return cached
+        async with semaphore:
+            # Reserve a token only when about to call VIES, so a batch holds at
+            # most ``concurrency`` reservations in the shared bucket
+            await _country_limiter.acquire(country_code)
+            try:
+                return await _async_vat_flight.do(
+                    _cache_key(country_code, vat_number),
+                    _lookup_async,
+                    country_code,
+                    vat_number,
+                )
+            except Exception as e:
+                return _store_behind(
+                    _error_info(
+                        country_code, vat_number, f"Error validating VAT: {str(e)}"
+                    )
+                )
+
+    tasks = [asyncio.ensure_future(check(*key)) for key in keys if key not in rejected]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away or the consumer stopped early: drop pending lookups
+        for task in tasks:
+            task.cancel()